@@ -1,13 +1,35 @@
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from decimal import Decimal
 
 db = SQLAlchemy()
 migrate = Migrate()
 
-def create_app():
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    Money columns load as Decimal; keep sending them as JSON numbers, not strings.
+    """
+    @staticmethod
+    def default(o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return DefaultJSONProvider.default(o)
+
+
+def create_app(config_overrides=None):
     app = Flask(__name__)
+    app.json = JSONProvider(app)
     app.config.from_object('config.Config')
+    # Allow scripts (benchmarks, workers) to point the app at another database
+    if config_overrides:
+        app.config.update(config_overrides)
+
+    # Structured, level-gated logging with request ids
+    from .log import configure_logging
+    configure_logging(app)
 
     # Initialize SQLAlchemy and Migrate
     db.init_app(app)
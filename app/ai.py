@@ -0,0 +1,226 @@
+"""
+AI listing generation (title, description and starting price from a photo).
+
+Every call goes through one ListingGenerator per worker process, which:
+
+- caches parsed results by the SHA-256 of the image, so the same photo is only
+  ever sent to the model once per cache lifetime;
+- coalesces identical in-flight requests onto a single model call;
+- runs model calls on a bounded executor and stops waiting after a timeout, so
+  slow model calls cannot pile up and starve bidding traffic on the same worker.
+
+The model itself is a pluggable backend: GeminiBackend in production, FakeBackend
+(AI_BACKEND=fake) for offline runs.
+"""
+import os
+from app.cache import LRUCache
+from app.metrics import track_external
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import hashlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROMPT = (
+    "Generate a title, description, and a suggested starting price in USD for an auction listing based on this image. "
+    "The response should include:\n"
+    "Title: [Your Title Here]\n"
+    "Description: [Your Description Here]\n"
+    "Starting Price: [Suggested Starting Price Here in USD]\n"
+)
+
+
+class GenerationError(Exception):
+    """
+    Raised when a listing cannot be generated. Carries the HTTP status code the route should return.
+    """
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff_mime_type(image_bytes):
+    """
+    Best-effort image type from the file signature; Gemini needs it alongside the bytes.
+    """
+    if image_bytes.startswith(b'\xff\xd8\xff'):
+        return "image/jpeg"
+    if image_bytes.startswith(b'RIFF') and image_bytes[8:12] == b'WEBP':
+        return "image/webp"
+    return "image/png"
+
+
+def parse_listing_text(text):
+    """
+    Parse the model's "Title: / Description: / Starting Price:" answer into a dict.
+    """
+    text = text.strip()
+
+    # Default values
+    title = "Generated Title"
+    description = text  # Default to the full response if parsing fails
+    starting_price = "10.00"  # Default starting price
+
+    # Parse the AI response for "Title:", "Description:", and "Starting Price:"
+    if "Title:" in text and "Description:" in text:
+        title = text.split("Title:")[1].split("Description:")[0].strip()
+        description = text.split("Description:")[1].split("Starting Price:")[0].strip()
+    if "Starting Price:" in text:
+        raw_price = text.split("Starting Price:")[1].strip().split("\n")[0]
+        # Clean up the starting price (remove symbols like "**" and "$")
+        starting_price = raw_price.replace("**", "").replace("$", "").strip()
+        # Ensure it's formatted as a valid currency
+        try:
+            starting_price = f"{float(starting_price):.2f}"  # Convert to float and format as 2 decimal places
+        except ValueError:
+            starting_price = "10.00"  # Fallback to default if parsing fails
+
+    return {"title": title, "description": description, "starting_price": starting_price}
+
+
+class GeminiBackend:
+    """
+    Gemini via google.generativeai. The client is configured and the model built once,
+    not per request. The REST transport goes through requests, which gevent can
+    switch away from while waiting on the network (the default gRPC transport would
+    block the whole worker).
+    """
+    def __init__(self, api_key, model_name="gemini-1.5-flash", timeout=None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key, transport="rest")
+        self.name = f"gemini:{model_name}"
+        self.model = genai.GenerativeModel(model_name)
+        self.timeout = timeout
+
+    def generate(self, image_bytes, mime_type):
+        request_options = {"timeout": self.timeout} if self.timeout else None
+        with track_external('gemini', 'generate_content'):
+            response = self.model.generate_content(
+                [PROMPT, {"mime_type": mime_type, "data": image_bytes}],
+                request_options=request_options
+            )
+        return response.text
+
+
+class FakeBackend:
+    """
+    Offline stand-in for tests and benchmarks. Returns a canned answer after an
+    optional delay and counts calls, so caching and coalescing can be observed.
+    """
+    name = "fake"
+
+    def __init__(self, text=None, delay=0.0):
+        self.text = text or (
+            "Title: Sample Item\n"
+            "Description: A sample item generated without calling a model.\n"
+            "Starting Price: $10.00\n"
+        )
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, image_bytes, mime_type):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return self.text
+
+
+class ListingGenerator:
+    """
+    Cached, coalescing, bounded front end to a model backend. Thread-safe.
+    """
+    def __init__(self, backend, cache_size=1024, cache_ttl=86400, max_workers=4, max_pending=32, timeout=30.0):
+        self.backend = backend
+        self.cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai")
+        self._in_flight = {}  # cache key -> Future shared by every caller asking for that image
+        # Reentrant: a future that is already done runs its done-callback inside generate()
+        self._lock = threading.RLock()
+
+    def _call(self, key, image_bytes):
+        started = time.perf_counter()
+        result = parse_listing_text(self.backend.generate(image_bytes, sniff_mime_type(image_bytes)))
+        self.cache.set(key, result)
+        elapsed = time.perf_counter() - started
+        logger.info("AI listing generated in %.2fs", elapsed, extra={"backend": self.backend.name, "elapsed": elapsed})
+        return result
+
+    def _done(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def generate(self, image_bytes):
+        """
+        Return {"title", "description", "starting_price"} for an image. Raises
+        GenerationError: 503 when too many calls are queued, 504 on timeout.
+        """
+        key = (self.backend.name, hashlib.sha256(image_bytes).hexdigest())
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                if len(self._in_flight) >= self.max_pending:
+                    raise GenerationError("AI generation is busy, try again shortly", 503)
+                future = self._in_flight[key] = self.executor.submit(self._call, key, image_bytes)
+                future.add_done_callback(lambda done: self._done(key, done))
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # The call keeps running (and fills the cache when it finishes); only this caller gives up
+            raise GenerationError("AI generation timed out", 504)
+        except GenerationError:
+            raise
+        except Exception as e:
+            raise GenerationError(str(e), 500)
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def build_backend(config):
+    if config['AI_BACKEND'] == 'fake':
+        return FakeBackend(delay=config['AI_FAKE_DELAY'])
+    if config['AI_BACKEND'] == 'gemini':
+        return GeminiBackend(os.environ.get("GEMINI_API_KEY"), config['GEMINI_MODEL'], timeout=config['AI_TIMEOUT'])
+    raise ValueError(f"Unknown AI_BACKEND: {config['AI_BACKEND']}")
+
+
+def get_listing_generator(config):
+    """
+    The process-wide ListingGenerator, built on first use from the app config.
+    """
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = ListingGenerator(
+                    build_backend(config),
+                    cache_size=config['AI_CACHE_SIZE'],
+                    cache_ttl=config['AI_CACHE_TTL'],
+                    max_workers=config['AI_MAX_WORKERS'],
+                    max_pending=config['AI_MAX_PENDING'],
+                    timeout=config['AI_TIMEOUT']
+                )
+    return _generator
+
+
+def set_listing_generator(generator):
+    """
+    Replace the process-wide generator, e.g. with one around a FakeBackend in a test.
+    """
+    global _generator
+    with _generator_lock:
+        _generator = generator
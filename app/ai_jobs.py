@@ -0,0 +1,283 @@
+"""
+Asynchronous AI listing generation.
+
+POST /generate-listing/jobs stores the photo in S3 and inserts a GenerationJob row;
+GET /generate-listing/jobs/<id> reads the row back. Neither waits for the model.
+A separate worker process runs the jobs, at most AI_JOB_CONCURRENCY at a time:
+
+    python -m app.ai_jobs
+
+Model calls go through a ListingGenerator (app/ai.py), as /generate-listing does,
+so repeated photos hit its result cache and slow calls its timeout. A photo that
+an earlier job already described is answered at submit time from that job's result.
+"""
+from app import db
+from app.ai import ListingGenerator, build_backend
+from app.clients import get_s3_client, client_settings, S3_SETTINGS
+from app.models import GenerationJob
+from app.validation import parse_money
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func
+from uuid import uuid4
+import hashlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+JOB_IMAGE_PREFIX = 'generation-jobs/'
+# How long a running job is hidden from other workers before it is presumed lost
+CLAIM_LEASE = timedelta(seconds=120)
+# Retry backoff: BACKOFF_BASE * 2 ** (attempts - 1), capped
+BACKOFF_BASE = 5.0
+BACKOFF_MAX = 300.0
+
+
+def enqueue_generation_job(user_id, bucket, image_bytes=None, image_key=None):
+    """
+    Create a job for an uploaded photo (image_bytes) or one already in the bucket
+    (image_key) and commit it. Returns the job.
+    """
+    now = datetime.utcnow()
+    job = GenerationJob(id=uuid4().hex, user_id=user_id, status='queued', attempts=0, next_attempt_at=now)
+
+    if image_bytes is not None:
+        job.image_sha256 = hashlib.sha256(image_bytes).hexdigest()
+        job.image_key = f"{JOB_IMAGE_PREFIX}{job.id}"
+
+        # Same photo as a finished job: answer now, skip S3 and the model
+        previous = (
+            GenerationJob.query
+            .filter(GenerationJob.image_sha256 == job.image_sha256, GenerationJob.status == 'succeeded')
+            .order_by(GenerationJob.finished_at.desc())
+            .first()
+        )
+        if previous is not None:
+            job.status = 'succeeded'
+            job.title = previous.title
+            job.description = previous.description
+            job.starting_price = previous.starting_price
+            job.started_at = job.finished_at = now
+        else:
+            get_s3_client().put_object(Bucket=bucket, Key=job.image_key, Body=image_bytes)
+    else:
+        job.image_key = image_key
+
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def job_payload(job):
+    """
+    JSON view of a job. The listing fields are only present once it has succeeded.
+    """
+    payload = {
+        "job_id": job.id,
+        "status": job.status,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == 'succeeded':
+        payload.update({
+            "title": job.title,
+            "description": job.description,
+            "starting_price": f"{job.starting_price:.2f}",
+        })
+    elif job.status == 'failed':
+        payload["error"] = job.last_error
+    return payload
+
+
+def queue_stats():
+    """
+    Queue depth: job counts by status plus the age of the oldest queued job, in seconds.
+    """
+    counts = dict(
+        db.session.execute(
+            select(GenerationJob.status, func.count())
+            .where(GenerationJob.status.in_(('queued', 'running')))
+            .group_by(GenerationJob.status)
+        ).all()
+    )
+    oldest = db.session.execute(
+        select(func.min(GenerationJob.created_at)).where(GenerationJob.status == 'queued')
+    ).scalar()
+    return {
+        "queued": counts.get('queued', 0),
+        "running": counts.get('running', 0),
+        "oldest_queued_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+class GenerationJobWorker:
+    """
+    Keeps up to `concurrency` jobs running on a thread pool, claiming more as slots
+    free up. Only the main thread touches the database; pool threads fetch the photo
+    and call the model.
+    """
+    def __init__(self, generator, bucket, concurrency=4, max_attempts=3):
+        self.generator = generator
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        # Pool threads have no app context; they build their S3 client from these
+        self.s3_settings = client_settings(S3_SETTINGS)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ai-job")
+        self.running = {}  # Future -> (job id, image key, attempts)
+
+    def claim(self, limit):
+        """
+        Lease up to `limit` due jobs. Running jobs whose lease ran out (a crashed worker)
+        are picked up again. Returns (id, image_key, attempts) tuples.
+        """
+        now = datetime.utcnow()
+        rows = db.session.execute(
+            select(GenerationJob.id, GenerationJob.image_key, GenerationJob.attempts)
+            .where(GenerationJob.status.in_(('queued', 'running')), GenerationJob.next_attempt_at <= now)
+            .order_by(GenerationJob.next_attempt_at, GenerationJob.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        claimed = [tuple(row) for row in rows]
+        if claimed:
+            db.session.execute(
+                update(GenerationJob)
+                .where(GenerationJob.id.in_([job_id for job_id, _, _ in claimed]))
+                .values(status='running', started_at=now, next_attempt_at=now + CLAIM_LEASE)
+            )
+        db.session.commit()
+        return claimed
+
+    def _run(self, image_key):
+        # Runs on the pool; no database access here
+        body = get_s3_client(self.s3_settings).get_object(Bucket=self.bucket, Key=image_key)['Body'].read()
+        return hashlib.sha256(body).hexdigest(), self.generator.generate(body)
+
+    def _finish(self, future, job_id, image_key, attempts):
+        now = datetime.utcnow()
+        attempts += 1
+        try:
+            sha256, result = future.result()
+        except Exception as e:
+            values = {"attempts": attempts, "last_error": str(e)[:255]}
+            if attempts >= self.max_attempts:
+                values.update(status='failed', finished_at=now)
+                logger.error("Generation job %s failed after %d attempts: %s", job_id, attempts, e)
+            else:
+                delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+                values.update(status='queued', next_attempt_at=now + timedelta(seconds=delay))
+            db.session.execute(update(GenerationJob).where(GenerationJob.id == job_id).values(**values))
+            return False
+
+        # The model's price can be anything parse_listing_text accepts as a float ("inf",
+        # "nan", more than NUMERIC(12, 2) holds). Results are cached per photo, so a retry
+        # would get the same answer; fail the job now.
+        starting_price, error = parse_money(result["starting_price"])
+        if error:
+            db.session.execute(
+                update(GenerationJob)
+                .where(GenerationJob.id == job_id)
+                .values(
+                    status='failed',
+                    attempts=attempts,
+                    image_sha256=sha256,
+                    last_error=f"Generated starting_price {error}"[:255],
+                    finished_at=now
+                )
+            )
+            logger.error("Generation job %s failed: generated starting_price %s", job_id, error)
+            return False
+
+        db.session.execute(
+            update(GenerationJob)
+            .where(GenerationJob.id == job_id)
+            .values(
+                status='succeeded',
+                attempts=attempts,
+                image_sha256=sha256,
+                title=result["title"][:200],
+                description=result["description"],
+                starting_price=starting_price,
+                last_error=None,
+                finished_at=now
+            )
+        )
+        if image_key.startswith(JOB_IMAGE_PREFIX):
+            # Uploaded only for this job
+            try:
+                get_s3_client().delete_object(Bucket=self.bucket, Key=image_key)
+            except Exception as e:
+                logger.warning("Could not delete job image %s: %s", image_key, e)
+        return True
+
+    def step(self, poll_interval):
+        """
+        Fill free slots, then wait up to poll_interval for a job to finish and record
+        every finished one. Returns the number of jobs finished.
+        """
+        free = self.concurrency - len(self.running)
+        if free > 0:
+            for job_id, image_key, attempts in self.claim(free):
+                future = self.executor.submit(self._run, image_key)
+                self.running[future] = (job_id, image_key, attempts)
+
+        if not self.running:
+            time.sleep(poll_interval)
+            return 0
+
+        done, _ = wait(list(self.running), timeout=poll_interval, return_when=FIRST_COMPLETED)
+        for future in done:
+            self._finish(future, *self.running.pop(future))
+        if done:
+            db.session.commit()
+        return len(done)
+
+    def run_forever(self, poll_interval=1.0, stats_interval=30.0):
+        logger.info("Generation job worker started (concurrency %d)", self.concurrency)
+        last_stats = 0.0
+        try:
+            while True:
+                try:
+                    self.step(poll_interval)
+                    if time.monotonic() - last_stats >= stats_interval:
+                        last_stats = time.monotonic()
+                        stats = queue_stats()
+                        db.session.commit()
+                        logger.info("Generation queue depth: %d queued, %d running", stats['queued'], stats['running'],
+                                    extra=stats)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Generation job step failed")
+                    time.sleep(poll_interval)
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def main():
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        concurrency = app.config['AI_JOB_CONCURRENCY']
+        # Sized to the job slots, so a claimed job never waits behind the generator's own queue
+        generator = ListingGenerator(
+            build_backend(app.config),
+            cache_size=app.config['AI_CACHE_SIZE'],
+            cache_ttl=app.config['AI_CACHE_TTL'],
+            max_workers=concurrency,
+            max_pending=concurrency,
+            timeout=app.config['AI_TIMEOUT']
+        )
+        worker = GenerationJobWorker(
+            generator,
+            app.config['S3_BUCKET'],
+            concurrency=concurrency,
+            max_attempts=app.config['AI_JOB_MAX_ATTEMPTS']
+        )
+        worker.run_forever(app.config['AI_JOB_POLL_INTERVAL'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+from app.models import Listing, User, Notification, Bid, ProxyBid
+from app import db
+from app.outbox import enqueue_sms
+from app.cache import invalidate_listing
+from app.events import bid_events, bid_event
+from app.leaderboards import trend_score_after_bid
+from app.validation import parse_money
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import update, case, literal, or_
+from collections import namedtuple
+
+
+# Minimum raise over the current price: (prices below this bound, increment). Listings
+# at or above the last bound step by TOP_INCREMENT.
+BID_INCREMENTS = (
+    (Decimal('1.00'), Decimal('0.05')),
+    (Decimal('5.00'), Decimal('0.25')),
+    (Decimal('25.00'), Decimal('0.50')),
+    (Decimal('100.00'), Decimal('1.00')),
+    (Decimal('250.00'), Decimal('2.50')),
+    (Decimal('500.00'), Decimal('5.00')),
+    (Decimal('1000.00'), Decimal('10.00')),
+    (Decimal('2500.00'), Decimal('25.00')),
+    (Decimal('5000.00'), Decimal('50.00')),
+)
+TOP_INCREMENT = Decimal('100.00')
+
+
+def minimum_bid(price):
+    """
+    The lowest acceptable next bid on a listing currently at `price`.
+    """
+    for bound, increment in BID_INCREMENTS:
+        if price < bound:
+            return price + increment
+    return price + TOP_INCREMENT
+
+
+# minimum_bid(Listing.current_price) in SQL, built once and reused by every bid
+MINIMUM_BID = Listing.current_price + case(
+    *[(Listing.current_price < bound, literal(increment, Listing.current_price.type))
+      for bound, increment in BID_INCREMENTS],
+    else_=literal(TOP_INCREMENT, Listing.current_price.type)
+)
+
+
+# What a bid or maximum did: the bidder's own Bid row (None when a leader only raised their
+# maximum), whether they now lead, and the listing's new price and end time
+BidOutcome = namedtuple('BidOutcome', ('bid', 'winning', 'current_price', 'end_time'))
+
+
+class BidError(Exception):
+    """
+    Raised when a bid is rejected. Carries the HTTP status code the route should return.
+    """
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def submit_bid(listing_id, user_id, amount):
+    """
+    Place a bid of exactly `amount` by `user_id` on `listing_id`. Returns a BidOutcome.
+    """
+    return _place(listing_id, user_id, amount, proxy=False)
+
+
+def submit_max_bid(listing_id, user_id, max_amount):
+    """
+    Set `user_id`'s hidden maximum on `listing_id` (eBay-style proxy bidding). The engine
+    bids for them, one increment at a time, up to that maximum. Returns a BidOutcome.
+    """
+    return _place(listing_id, user_id, max_amount, proxy=True)
+
+
+def _place(listing_id, user_id, amount, proxy):
+    """
+    Resolve a bid against the current leader in one transaction.
+
+    Only the leader's maximum can be above the current price (anyone outbid has been
+    pushed past theirs), so a new bid is only ever a contest between the bidder and the
+    leader: the higher maximum wins, at one increment over the loser's maximum (capped
+    at the winner's), and an equal maximum goes to the earlier one. Both sides' bids
+    are written at once, so a bidding war between two proxies is one request, one bid
+    pair and one round of notifications instead of a request per raise.
+
+    The first statement is a conditional UPDATE that checks the bid is allowed (listing
+    open, not the seller, at least minimum_bid() of the current price) and takes the
+    listing's row lock, which serializes everything after it (reading the leader's
+    maximum, writing bids and notifications) against other bids on the same listing
+    until commit. On SQLite it takes the database write lock instead.
+    """
+    label = "Maximum bid" if proxy else "Bid amount"
+    amount, error = parse_money(amount)
+    if error:
+        raise BidError(f"{label} {error}")
+
+    now = datetime.utcnow()
+    allowed = MINIMUM_BID <= amount
+    if proxy:
+        # The leader may raise their own maximum by any amount
+        allowed = or_(allowed, Listing.highest_bidder_id == user_id)
+    result = db.session.execute(
+        update(Listing)
+        .where(
+            Listing.id == listing_id,
+            allowed,
+            Listing.user_id != user_id,
+            Listing.is_active.isnot(False),
+            Listing.end_time > now
+        )
+        .values(bid_count=Listing.bid_count)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        raise _rejection(listing_id, user_id, now, "Maximum bid" if proxy else "Bid")
+
+    listing = (
+        Listing.query
+        .filter_by(id=listing_id)
+        .with_for_update()
+        .populate_existing()
+        .one()
+    )
+    price = listing.current_price
+    leader_id = listing.highest_bidder_id
+
+    own_max = None
+    if proxy:
+        own_max = ProxyBid.query.filter_by(listing_id=listing_id, user_id=user_id).first()
+        if leader_id == user_id:
+            # Already winning: only the hidden maximum moves
+            floor = max(price, own_max.max_amount) if own_max else price
+            if amount <= floor:
+                db.session.rollback()
+                raise BidError(f"Maximum bid must be more than {floor}")
+            _save_max(own_max, listing_id, user_id, amount, now)
+            end_time = listing.end_time
+            db.session.commit()
+            return BidOutcome(None, True, price, end_time)
+
+    # The leader's reach: their maximum if it is above the price, else the price itself
+    defender = None
+    if leader_id is not None and leader_id != user_id:
+        leader_max = ProxyBid.query.filter_by(listing_id=listing_id, user_id=leader_id).first()
+        defender = price
+        if leader_max is not None and leader_max.max_amount > price:
+            defender = leader_max.max_amount
+
+    # (user_id, amount) of each bid to write, in increasing amount order
+    bids = []
+    if defender is None:
+        # No one to outbid (or the leader raising their own price)
+        bids.append((user_id, minimum_bid(price) if proxy else amount))
+    elif amount > defender:
+        if defender > price:
+            # The leader's proxy bid up to its maximum before losing
+            bids.append((leader_id, defender))
+        bids.append((user_id, min(amount, minimum_bid(defender)) if proxy else amount))
+    elif amount < defender:
+        # The bidder's maximum is made in full, and the leader's proxy answers it
+        bids.append((user_id, amount))
+        bids.append((leader_id, min(defender, minimum_bid(amount))))
+    else:
+        # Equal maximums: the earlier one wins at that amount
+        bids.append((leader_id, defender))
+    winner_id = bids[-1][0]
+    new_price = bids[-1][1]
+
+    if proxy:
+        _save_max(own_max, listing_id, user_id, amount, now)
+
+    # Soft close: a bid near the end pushes it back, under the same row lock that the
+    # expiry sweep needs, so a listing can never be closed with this bid half-applied
+    end_time = listing.end_time
+    window = current_app.config['SOFT_CLOSE_WINDOW']
+    if window > 0 and end_time - now <= timedelta(seconds=window):
+        end_time = end_time + timedelta(seconds=current_app.config['SOFT_CLOSE_EXTENSION'])
+        listing.end_time = end_time
+
+    new_bids = [Bid(amount=bid_amount, user_id=bidder_id, listing_id=listing_id, timestamp=now)
+                for bidder_id, bid_amount in bids]
+    db.session.add_all(new_bids)
+    db.session.flush()
+    events = [bid_event(bid, end_time) for bid in new_bids]
+    own_bid = next((bid for bid in reversed(new_bids) if bid.user_id == user_id), None)
+
+    # Move the listing to the final state; intermediate proxy steps never show as the price
+    listing.current_price = new_price
+    listing.bid_count = Listing.bid_count + len(new_bids)
+    listing.trend_score = trend_score_after_bid(now, len(new_bids))
+    listing.highest_bid_id = new_bids[-1].id
+    listing.highest_bidder_id = winner_id
+
+    _notify(listing, user_id, leader_id, winner_id)
+    # SMS go out through the outbox, committed atomically with the bids and notifications
+    db.session.commit()
+
+    # Cached bid history for this listing is now stale; viewers in this worker get the bids now
+    invalidate_listing(listing_id)
+    bid_events.publish(events)
+
+    return BidOutcome(own_bid, winner_id == user_id, new_price, end_time)
+
+
+def _save_max(own_max, listing_id, user_id, amount, now):
+    if own_max is None:
+        db.session.add(ProxyBid(listing_id=listing_id, user_id=user_id, max_amount=amount,
+                                created_at=now, updated_at=now))
+    else:
+        own_max.max_amount = amount
+        own_max.updated_at = now
+
+
+def _notify(listing, user_id, leader_id, winner_id):
+    """
+    Notifications for the final outcome of one bid, however many proxy steps it took:
+    the seller hears about the new price once, and whoever ends up outbid hears about it
+    once. Nothing is sent when a leader raises their own bid.
+    """
+    if leader_id == user_id:
+        return
+
+    # Notify the seller
+    seller = db.session.get(User, listing.user_id)
+    message = f"A new bid has been placed on your listing: {listing.title}"
+    db.session.add(Notification(user_id=listing.user_id, message=message, is_read=False,
+                                listing_id=listing.id, kind='new_bid'))
+    if seller and seller.phone_number:
+        enqueue_sms(seller.phone_number, message)
+
+    if winner_id == user_id:
+        # Notify the previous highest bidder (if applicable)
+        if leader_id:
+            previous_bidder = db.session.get(User, leader_id)
+            message = f"You have been outbid on {listing.title}."
+            db.session.add(Notification(user_id=leader_id, message=message, is_read=False,
+                                        listing_id=listing.id, kind='outbid'))
+            if previous_bidder and previous_bidder.phone_number:
+                enqueue_sms(previous_bidder.phone_number, message)
+    else:
+        # Outbid straight away by the leader's maximum; the bidder learns it from the
+        # response, so this is a feed entry without an SMS
+        message = f"You have been outbid on {listing.title}."
+        db.session.add(Notification(user_id=user_id, message=message, is_read=False,
+                                    listing_id=listing.id, kind='outbid'))
+
+
+def _rejection(listing_id, user_id, now, label="Bid"):
+    """
+    Work out why the conditional UPDATE in _place matched no row.
+    """
+    listing = db.session.get(Listing, listing_id)
+    if not listing:
+        return BidError("Listing not found", 404)
+    if listing.user_id == user_id:
+        return BidError("You cannot bid on your own listing.")
+    if listing.is_active is False or listing.end_time <= now:
+        return BidError("This listing has ended.")
+    return BidError(f"{label} must be at least {minimum_bid(listing.current_price)}")
@@ -0,0 +1,131 @@
+from app.models import Listing
+from app import db
+from config import Config
+from flask import current_app, request
+from collections import OrderedDict
+from sqlalchemy import select
+import threading
+import time
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache. Entries can carry a TTL and a tag; invalidate_tag
+    drops every entry stored under that tag (e.g. everything cached for one listing).
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at, tag)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, tag=None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, tag)
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        # Caller holds the lock
+        _, _, tag = self._entries.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+# Serialized bid-history responses, keyed by (endpoint, listing_id, version)
+bid_history_cache = LRUCache(maxsize=Config.BID_HISTORY_CACHE_SIZE)
+# Listing versions, so repeated polls within the TTL skip the database entirely
+listing_version_cache = LRUCache(maxsize=Config.BID_HISTORY_CACHE_SIZE, ttl=Config.LISTING_VERSION_TTL)
+# Serialized auction-page summaries, keyed by (listing_id, bid limit). The TTL also bounds
+# how stale non-bid changes (expiry, image derivatives) and other workers' bids can be
+listing_summary_cache = LRUCache(maxsize=Config.BID_HISTORY_CACHE_SIZE, ttl=Config.LISTING_SUMMARY_TTL)
+
+
+def get_listing_version(listing_id):
+    """
+    Return a version string that changes whenever a bid is accepted on the listing, or
+    None if the listing does not exist. Bids are never edited or deleted, so the bid
+    count and highest-bid pointer identify the bid history exactly.
+    """
+    version = listing_version_cache.get(listing_id)
+    if version is None:
+        row = db.session.execute(
+            select(Listing.bid_count, Listing.highest_bid_id).where(Listing.id == listing_id)
+        ).first()
+        if row is None:
+            return None
+        version = f"{listing_id}-{row.bid_count}-{row.highest_bid_id or 0}"
+        listing_version_cache.set(listing_id, version, tag=listing_id)
+    return version
+
+
+def invalidate_listing(listing_id):
+    """
+    Drop everything cached for a listing. Called by the bid engine after a bid commits.
+    Other gunicorn workers pick the change up once their LISTING_VERSION_TTL (or, for
+    summaries, LISTING_SUMMARY_TTL) expires.
+    """
+    listing_version_cache.invalidate_tag(listing_id)
+    bid_history_cache.invalidate_tag(listing_id)
+    listing_summary_cache.invalidate_tag(listing_id)
+
+
+def conditional_json_response(cache, key, etag, build, tag=None):
+    """
+    Serve a JSON response with a strong ETag. Returns 304 when the client already has
+    this version; otherwise serves the serialized body from `cache`, calling build()
+    and serializing only on a miss.
+    """
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    body = cache.get(key)
+    if body is None:
+        body = current_app.json.dumps(build())
+        cache.set(key, body, tag=tag)
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,140 @@
+"""
+Shared external-service clients, built once per worker process.
+
+boto3 client construction loads endpoint metadata and resolves credentials, and a
+fresh client also means fresh TLS connections, so every S3 and Twilio call reuses
+the clients held here. Clients are created lazily on first use and dropped in a
+forked child (gunicorn pre-fork, multiprocessing), because connection pools must
+never be shared across processes. Both boto3 clients and the Twilio client are
+safe to share between threads once built.
+
+Clients are built from the current app's config (create_app overrides included) and
+cached per distinct set of settings, so an app pointed at a local S3 endpoint gets
+its own client. Outside an app context, e.g. in a worker's pool process, the Config
+defaults apply unless the caller passes the settings it captured in the app.
+"""
+from config import Config
+from flask import current_app, has_app_context
+import boto3
+import botocore.config
+from app.metrics import instrument_boto3_client, track_external
+import os
+import threading
+
+# Config keys each client is built from
+S3_SETTINGS = ('S3_REGION', 'S3_ENDPOINT_URL', 'AWS_MAX_POOL_CONNECTIONS', 'AWS_MAX_ATTEMPTS',
+               'AWS_CONNECT_TIMEOUT', 'AWS_READ_TIMEOUT')
+TWILIO_SETTINGS = ('TWILIO_TIMEOUT', 'TWILIO_MAX_RETRIES')
+
+_clients = {}  # (name, settings) -> client
+_overrides = {}  # name -> stand-in client
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def _reset_after_fork():
+    global _lock, _pid
+    _clients.clear()
+    _lock = threading.Lock()
+    _pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def client_settings(names):
+    """
+    The values of config keys `names` as a hashable tuple of (key, value) pairs: the
+    current app's config inside an app context, the Config defaults outside one.
+    """
+    if has_app_context():
+        return tuple((name, current_app.config[name]) for name in names)
+    return tuple((name, getattr(Config, name)) for name in names)
+
+
+def _get(name, settings, build):
+    # The pid check covers forks that bypass register_at_fork hooks
+    if _pid != os.getpid():
+        _reset_after_fork()
+    client = _overrides.get(name) or _clients.get((name, settings))
+    if client is None:
+        with _lock:
+            client = _clients.get((name, settings))
+            if client is None:
+                client = _clients[(name, settings)] = build(dict(settings))
+    return client
+
+
+def reset_clients():
+    """
+    Drop every cached client and override.
+    """
+    with _lock:
+        _clients.clear()
+        _overrides.clear()
+
+
+def override_client(name, client):
+    """
+    Install a stand-in client (e.g. an in-memory S3 for benchmarks) under 'name',
+    whatever the config says.
+    """
+    with _lock:
+        _overrides[name] = client
+
+
+def _build_s3(settings):
+    session = boto3.session.Session()
+    client = session.client(
+        's3',
+        region_name=settings['S3_REGION'],
+        # Point at a local stand-in (moto server, MinIO) when set
+        endpoint_url=settings['S3_ENDPOINT_URL'],
+        # Explicit keys when configured; otherwise the default chain (env, IAM role)
+        aws_access_key_id=os.getenv('S3_ACCESS_KEY'),
+        aws_secret_access_key=os.getenv('S3_SECRET_KEY'),
+        config=botocore.config.Config(
+            max_pool_connections=settings['AWS_MAX_POOL_CONNECTIONS'],
+            retries={'max_attempts': settings['AWS_MAX_ATTEMPTS'], 'mode': 'standard'},
+            connect_timeout=settings['AWS_CONNECT_TIMEOUT'],
+            read_timeout=settings['AWS_READ_TIMEOUT'],
+            tcp_keepalive=True
+        )
+    )
+    return instrument_boto3_client(client, 's3')
+
+
+def _build_twilio(settings):
+    from twilio.rest import Client
+    from twilio.http.http_client import TwilioHttpClient
+
+    class TimedTwilioHttpClient(TwilioHttpClient):
+        def request(self, method, url, *args, **kwargs):
+            with track_external('twilio', method):
+                return super().request(method, url, *args, **kwargs)
+
+    return Client(
+        os.getenv("TWILIO_ACCOUNT_SID"),
+        os.getenv("TWILIO_AUTH_TOKEN"),
+        http_client=TimedTwilioHttpClient(
+            pool_connections=True,
+            timeout=settings['TWILIO_TIMEOUT'],
+            max_retries=settings['TWILIO_MAX_RETRIES']
+        )
+    )
+
+
+def get_s3_client(settings=None):
+    """
+    Returns the shared S3 client. If running on AWS (Elastic Beanstalk), it will use the IAM Role.
+    Pass client_settings(S3_SETTINGS) captured in the app when calling from outside an app context.
+    """
+    return _get('s3', settings or client_settings(S3_SETTINGS), _build_s3)
+
+
+def get_twilio_client():
+    """
+    Returns the shared Twilio REST client.
+    """
+    return _get('twilio', client_settings(TWILIO_SETTINGS), _build_twilio)
@@ -0,0 +1,157 @@
+"""
+Live bid fan-out for /listings/<id>/stream.
+
+Each gunicorn worker runs one background poller that tails the bid table by primary
+key (id > cursor) and fans new bids out to the stream and long-poll requests waiting
+in that worker. The database is the cross-worker bus: however many viewers are
+connected, each worker issues one cheap range query per STREAM_POLL_INTERVAL. Bids
+placed in the same worker are also published directly by the bid engine, so they
+reach local viewers without waiting for the next poll.
+
+Waiting requests block on a per-listing Condition, so under the gevent worker class
+an idle connection is just a parked greenlet and a bid only wakes that listing's
+viewers.
+"""
+from app.models import Bid, Listing
+from app import db
+from config import Config
+from collections import OrderedDict, deque
+from sqlalchemy import select, func
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def bid_event(bid, end_time=None):
+    """
+    The payload pushed to clients for one bid (a Bid or a row with the same columns).
+    end_time is the listing's, which a soft-close bid may have just pushed back.
+    """
+    return {
+        "id": bid.id,
+        "listing_id": bid.listing_id,
+        "amount": float(bid.amount),  # json.dumps cannot encode Decimal
+        "user_id": bid.user_id,
+        "timestamp": bid.timestamp.isoformat() if bid.timestamp else None,
+        "end_time": end_time.isoformat() if end_time else None
+    }
+
+
+class BidEventBus:
+    # Re-scan this many ids behind the cursor so bids committed out of id order
+    # (concurrent transactions on MySQL) are still picked up
+    OVERLAP = 50
+    # Bids remembered per listing, listings remembered, and ids remembered for dedupe
+    BUFFER_SIZE = 50
+    MAX_LISTINGS = 10000
+    MAX_SEEN = 10000
+
+    def __init__(self, poll_interval=0.5):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._buffers = OrderedDict()  # listing_id -> deque of bid events
+        self._conditions = {}  # listing_id -> Condition sharing self._lock
+        self._waiters = {}  # listing_id -> number of waiting requests
+        self._seen = set()
+        self._seen_order = deque()
+        self._cursor = None
+        self._thread = None
+
+    def start(self, app):
+        """
+        Start this worker's poller on first use. Safe to call on every request.
+        """
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            with app.app_context():
+                self._cursor = db.session.execute(select(func.max(Bid.id))).scalar() or 0
+                db.session.remove()
+            self._thread = threading.Thread(target=self._run, args=(app,), name="bid-events", daemon=True)
+            self._thread.start()
+
+    def publish(self, events):
+        """
+        Add bid events and wake the requests waiting on those listings. Duplicates
+        (local publish followed by the poller seeing the same bid) are dropped.
+        """
+        with self._lock:
+            touched = set()
+            for event in events:
+                if event["id"] in self._seen:
+                    continue
+                self._remember(event["id"])
+                listing_id = event["listing_id"]
+                buffer = self._buffers.get(listing_id)
+                if buffer is None:
+                    buffer = self._buffers[listing_id] = deque(maxlen=self.BUFFER_SIZE)
+                self._buffers.move_to_end(listing_id)
+                buffer.append(event)
+                touched.add(listing_id)
+
+            while len(self._buffers) > self.MAX_LISTINGS:
+                self._buffers.popitem(last=False)
+
+            for listing_id in touched:
+                condition = self._conditions.get(listing_id)
+                if condition is not None:
+                    condition.notify_all()
+
+    def wait(self, listing_id, since_id, timeout):
+        """
+        Block until bids newer than since_id arrive for the listing, or timeout seconds
+        pass. Returns the new bid events (possibly empty), oldest first.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            condition = self._conditions.get(listing_id)
+            if condition is None:
+                condition = self._conditions[listing_id] = threading.Condition(self._lock)
+            self._waiters[listing_id] = self._waiters.get(listing_id, 0) + 1
+            try:
+                while True:
+                    events = [event for event in self._buffers.get(listing_id, ()) if event["id"] > since_id]
+                    if events:
+                        return events
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return []
+                    condition.wait(remaining)
+            finally:
+                self._waiters[listing_id] -= 1
+                if not self._waiters[listing_id]:
+                    del self._waiters[listing_id]
+                    del self._conditions[listing_id]
+
+    def _remember(self, bid_id):
+        # Caller holds the lock
+        self._seen.add(bid_id)
+        self._seen_order.append(bid_id)
+        if len(self._seen_order) > self.MAX_SEEN:
+            self._seen.discard(self._seen_order.popleft())
+
+    def _run(self, app):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                with app.app_context():
+                    rows = db.session.execute(
+                        select(Bid.id, Bid.listing_id, Bid.amount, Bid.user_id, Bid.timestamp, Listing.end_time)
+                        .join(Listing, Listing.id == Bid.listing_id)
+                        .where(Bid.id > self._cursor - self.OVERLAP)
+                        .order_by(Bid.id)
+                        .limit(1000)
+                    ).all()
+                    db.session.remove()
+                if rows:
+                    self._cursor = max(self._cursor, rows[-1].id)
+                    self.publish([bid_event(row, row.end_time) for row in rows])
+            except Exception:
+                logger.exception("Bid event poll failed")
+
+
+bid_events = BidEventBus(poll_interval=Config.STREAM_POLL_INTERVAL)
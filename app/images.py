@@ -0,0 +1,314 @@
+"""
+Resized image derivatives for listing photos.
+
+Uploads through /upload-file and /upload-file/stream (and listings created with a
+presigned-upload image_url) queue an ImageAsset row. A separate worker process
+renders a small and a medium copy of each original on a process pool, stores them
+next to the original in S3 and copies their URLs onto every listing that uses the
+image, so list views never have to download full-size photos:
+
+    python -m app.images
+    python -m app.images --backfill   # queue images of listings created before this existed
+
+Derivative keys are derived from the original key, and a derivative that already
+exists in S3 is not rendered again, so re-running a job is harmless.
+"""
+from app import db
+from app.clients import get_s3_client, client_settings, S3_SETTINGS
+from app.models import ImageAsset, Listing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+from sqlalchemy import select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import argparse
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Derivative name -> longest edge in pixels
+DERIVATIVES = {
+    'thumb': 320,
+    'medium': 1024,
+}
+# Output encodings: format -> (extension, content type, save options)
+FORMATS = {
+    'WEBP': ('webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'JPEG': ('jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DERIVATIVE_PREFIX = 'derivatives/'
+# How long a claimed asset is hidden from other workers while it is rendered
+CLAIM_LEASE = timedelta(seconds=300)
+# Retry backoff: BACKOFF_BASE * 2 ** (attempts - 1), capped
+BACKOFF_BASE = 30.0
+BACKOFF_MAX = 3600.0
+
+
+def s3_url(bucket, region, key):
+    return f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
+
+
+def s3_key_for_url(url, bucket, region):
+    """
+    Return the object key of a URL in our bucket, or None for anything else
+    (external URLs, another bucket).
+    """
+    prefix = s3_url(bucket, region, '')
+    if not url or not url.startswith(prefix) or len(url) == len(prefix):
+        return None
+    return url[len(prefix):]
+
+
+def derivative_key(key, name, image_format):
+    extension = FORMATS[image_format][0]
+    return f"{DERIVATIVE_PREFIX}{key}.{name}.{extension}"
+
+
+def enqueue_image(url, key):
+    """
+    Queue an uploaded image for derivative rendering in the current transaction.
+    Does nothing if the image is already known, including when a concurrent request
+    queues the same URL first. Returns the image's row.
+    """
+    if key.startswith(DERIVATIVE_PREFIX):
+        return None
+    values = dict(url=url, s3_key=key, status='pending', attempts=0)
+    # An insert that skips duplicates, rather than check-then-insert, which two requests
+    # can both pass before either commits
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        statement = mysql_insert(ImageAsset).values(**values)
+        db.session.execute(statement.on_duplicate_key_update(id=ImageAsset.id))
+    elif dialect == 'sqlite':
+        db.session.execute(sqlite_insert(ImageAsset).values(**values).on_conflict_do_nothing(index_elements=['url']))
+    elif ImageAsset.query.filter_by(url=url).first() is None:
+        db.session.add(ImageAsset(**values))
+        db.session.flush()
+    # A locking read, so on MySQL it sees a row another transaction has just committed
+    return db.session.execute(
+        select(ImageAsset).where(ImageAsset.url == url).with_for_update()
+    ).scalar_one()
+
+
+def derivative_urls(url):
+    """
+    (thumb_url, medium_url) of an image that has already been processed, else (None, None).
+    The asset row stays locked until the caller commits, so a worker finishing it
+    meanwhile waits and then also sees the caller's new listing.
+    """
+    row = db.session.execute(
+        select(ImageAsset.status, ImageAsset.thumb_url, ImageAsset.medium_url)
+        .where(ImageAsset.url == url)
+        .with_for_update()
+    ).first()
+    if row is None or row.status != 'ready':
+        return None, None
+    return row.thumb_url, row.medium_url
+
+
+def _exists(s3, bucket, key):
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+        return True
+    except s3.exceptions.ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+
+def render_derivatives(bucket, key, image_format, s3_settings=None):
+    """
+    Render every derivative of s3://bucket/key that is not already in S3. Runs in a
+    pool process: S3 and Pillow only, no database access or app context, so the S3
+    settings come from the worker. Returns {name: key}.
+    """
+    from PIL import Image, ImageOps
+
+    s3 = get_s3_client(s3_settings)
+    keys = {name: derivative_key(key, name, image_format) for name in DERIVATIVES}
+    missing = [name for name, target in keys.items() if not _exists(s3, bucket, target)]
+    if not missing:
+        return keys
+
+    _, content_type, options = FORMATS[image_format]
+    body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    with Image.open(BytesIO(body)) as original:
+        # Let the JPEG decoder downscale while decoding; far cheaper than a full decode
+        largest = max(DERIVATIVES[name] for name in missing)
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        # JPEG has no alpha channel; WebP keeps transparency when the original has it
+        transparent = 'A' in image.getbands() or 'transparency' in image.info
+        mode = 'RGBA' if image_format == 'WEBP' and transparent else 'RGB'
+        if image.mode != mode:
+            image = image.convert(mode)
+
+        # Largest first, so each smaller size is resampled from the previous one
+        for name in sorted(missing, key=lambda name: DERIVATIVES[name], reverse=True):
+            image.thumbnail((DERIVATIVES[name], DERIVATIVES[name]), Image.LANCZOS)
+            output = BytesIO()
+            image.save(output, format=image_format, **options)
+            s3.put_object(
+                Bucket=bucket,
+                Key=keys[name],
+                Body=output.getvalue(),
+                ContentType=content_type,
+                # Derivative keys never change content, so browsers and CDNs may keep them
+                CacheControl='public, max-age=31536000, immutable'
+            )
+    return keys
+
+
+class ImageWorker:
+    """
+    Claims pending ImageAssets in batches, renders them on a process pool and records
+    the derivative URLs on the asset and on every listing that shows the image.
+    """
+    def __init__(self, bucket, region, image_format='WEBP', batch_size=20, max_workers=None, max_attempts=3):
+        if image_format not in FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.bucket = bucket
+        self.region = region
+        self.image_format = image_format
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.s3_settings = client_settings(S3_SETTINGS)
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def claim_batch(self):
+        """
+        Lease up to batch_size due assets. Returns (id, s3_key, url, attempts) tuples.
+        """
+        now = datetime.utcnow()
+        rows = db.session.execute(
+            select(ImageAsset.id, ImageAsset.s3_key, ImageAsset.url, ImageAsset.attempts)
+            .where(ImageAsset.status == 'pending', ImageAsset.next_attempt_at <= now)
+            .order_by(ImageAsset.next_attempt_at, ImageAsset.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        claimed = [tuple(row) for row in rows]
+        if claimed:
+            db.session.execute(
+                update(ImageAsset)
+                .where(ImageAsset.id.in_([asset_id for asset_id, _, _, _ in claimed]))
+                .values(next_attempt_at=now + CLAIM_LEASE)
+            )
+        db.session.commit()
+        return claimed
+
+    def process_once(self):
+        """
+        Render one batch. Returns the number of assets attempted.
+        """
+        claimed = self.claim_batch()
+        if not claimed:
+            return 0
+
+        futures = [
+            (asset_id, url, attempts, self.executor.submit(
+                render_derivatives, self.bucket, key, self.image_format, self.s3_settings
+            ))
+            for asset_id, key, url, attempts in claimed
+        ]
+        ready = 0
+        for asset_id, url, attempts, future in futures:
+            now = datetime.utcnow()
+            try:
+                keys = future.result()
+            except Exception as e:
+                attempts += 1
+                values = {"attempts": attempts, "last_error": str(e)[:255]}
+                if attempts >= self.max_attempts:
+                    values["status"] = 'failed'
+                    logger.error("Giving up on image %s after %d attempts: %s", url, attempts, e)
+                else:
+                    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+                    values["next_attempt_at"] = now + timedelta(seconds=delay)
+                db.session.execute(update(ImageAsset).where(ImageAsset.id == asset_id).values(**values))
+                db.session.commit()
+                continue
+
+            urls = {
+                "thumb_url": s3_url(self.bucket, self.region, keys['thumb']),
+                "medium_url": s3_url(self.bucket, self.region, keys['medium']),
+            }
+            db.session.execute(
+                update(ImageAsset)
+                .where(ImageAsset.id == asset_id)
+                .values(status='ready', processed_at=now, attempts=attempts + 1, last_error=None, **urls)
+            )
+            db.session.execute(
+                update(Listing)
+                .where(Listing.image_url == url)
+                .values(**urls)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            ready += 1
+
+        logger.info("Image batch: %d ready, %d failed", ready, len(claimed) - ready)
+        return len(claimed)
+
+    def backfill(self):
+        """
+        Queue the images of listings that have no derivatives yet. Returns the number queued.
+        """
+        urls = db.session.execute(
+            select(Listing.image_url)
+            .where(Listing.image_url.isnot(None), Listing.thumb_url.is_(None))
+            .distinct()
+        ).scalars().all()
+        queued = 0
+        for url in urls:
+            key = s3_key_for_url(url, self.bucket, self.region)
+            if key and enqueue_image(url, key) is not None:
+                queued += 1
+        db.session.commit()
+        return queued
+
+    def run_forever(self, poll_interval=2.0):
+        logger.info("Image worker started")
+        try:
+            while True:
+                try:
+                    attempted = self.process_once()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Image batch failed")
+                    attempted = 0
+                # Keep going while there is a backlog; only sleep when idle
+                if attempted < self.batch_size:
+                    time.sleep(poll_interval)
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def main():
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description="Render listing image derivatives.")
+    parser.add_argument("--backfill", action="store_true", help="Queue images of existing listings and exit")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        worker = ImageWorker(
+            app.config['S3_BUCKET'],
+            app.config['S3_REGION'],
+            image_format=app.config['IMAGE_FORMAT'],
+            batch_size=app.config['IMAGE_BATCH_SIZE'],
+            max_workers=app.config['IMAGE_MAX_WORKERS'] or None,
+            max_attempts=app.config['IMAGE_MAX_ATTEMPTS']
+        )
+        if args.backfill:
+            logger.info("Queued %d images for derivatives", worker.backfill())
+            worker.executor.shutdown()
+            return
+        worker.run_forever(app.config['IMAGE_POLL_INTERVAL'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+"Ending soon" and "trending" leaderboards (GET /listings/ending-soon, /listings/trending).
+
+Both are read straight off an index in the order they are served, so a request
+reads `limit` rows and never sorts or aggregates:
+
+- Ending soon walks ix_listing_active_end_time_id from now onwards.
+- Trending walks ix_listing_active_trend_score_id. listing.trend_score is an
+  exponentially decaying bid count (half-life TREND_HALF_LIFE) that the bid engine
+  (app/bidding.py) sets as an SQL expression on the listing, under its row lock,
+  for every bid it writes, so it is maintained per bid rather than computed per
+  request.
+
+Closing a listing clears is_active and drops it out of both index ranges. Each
+worker caches the serialized boards for LEADERBOARD_TTL seconds, which also bounds
+how long a closed listing or a new bid takes to show.
+
+trend_score is kept in log space relative to a fixed epoch: a bid at time t adds
+2 ** ((t - TREND_EPOCH) / TREND_HALF_LIFE) to the decayed sum, and the column
+stores the log of that sum. Every listing decays at the same rate, so stored scores
+rank correctly at any later time without being rewritten, and the current decayed
+count is exp(trend_score - trend_position(now)).
+"""
+from app.cache import LRUCache
+from app.models import Listing
+from config import Config
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import load_only
+import math
+
+# Changing either rescales every stored trend_score; the migration that added the
+# column (2eba461d9ac4) uses the same values for its backfill
+TREND_EPOCH = datetime(2025, 1, 1)
+TREND_HALF_LIFE = 3600.0  # Seconds
+
+DEFAULT_LEADERBOARD_SIZE = 20
+MAX_LEADERBOARD_SIZE = 100
+
+# Fields each board returns
+LEADERBOARD_FIELDS = ("id", "title", "current_price", "end_time", "bid_count", "thumb_url")
+
+# Serialized boards, keyed by (board, limit)
+leaderboard_cache = LRUCache(maxsize=64, ttl=Config.LEADERBOARD_TTL)
+
+
+def trend_position(now):
+    """
+    The log of the weight a bid placed at `now` adds to the decayed sum.
+    """
+    return (now - TREND_EPOCH).total_seconds() / TREND_HALF_LIFE * math.log(2)
+
+
+def trend_score_after_bid(now, count=1):
+    """
+    SQL expression for trend_score with `count` more bids at `now`: log(exp(score) + count * exp(x)),
+    computed as x + log(count + exp(score - x)) so it cannot overflow. A listing without
+    bids has a NULL score.
+    """
+    position = trend_position(now)
+    return position + func.ln(count + func.coalesce(func.exp(Listing.trend_score - position), 0))
+
+
+def ending_soon(limit):
+    """
+    Active listings that have not ended yet, ending soonest first.
+    """
+    now = datetime.utcnow()
+    listings = (
+        Listing.query
+        .options(load_only(*[getattr(Listing, field) for field in LEADERBOARD_FIELDS]))
+        .filter(Listing.is_active == True, Listing.end_time > now)
+        .order_by(Listing.end_time, Listing.id)
+        .limit(limit)
+        .all()
+    )
+    return [{field: getattr(listing, field) for field in LEADERBOARD_FIELDS} for listing in listings]
+
+
+def trending(limit):
+    """
+    Active listings with bids, by decayed bid count. "trend" is that count now: roughly
+    the number of bids in the last TREND_HALF_LIFE, with older bids counting for less.
+    """
+    now = datetime.utcnow()
+    position = trend_position(now)
+    listings = (
+        Listing.query
+        .options(load_only(*[getattr(Listing, field) for field in LEADERBOARD_FIELDS + ("trend_score",)]))
+        .filter(Listing.is_active == True, Listing.trend_score.isnot(None), Listing.end_time > now)
+        .order_by(Listing.trend_score.desc(), Listing.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        dict({field: getattr(listing, field) for field in LEADERBOARD_FIELDS},
+             trend=round(math.exp(listing.trend_score - position), 3))
+        for listing in listings
+    ]
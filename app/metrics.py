@@ -0,0 +1,287 @@
+"""
+Request, database and external-call instrumentation, exposed at GET /metrics in the
+Prometheus text format.
+
+- Every request on the main Blueprint records its duration, SQL query count and SQL
+  time, and external-call time, and returns them in a Server-Timing header.
+- SQLAlchemy engine events time every statement. Statements slower than
+  SLOW_QUERY_THRESHOLD seconds are logged with the endpoint that ran them.
+- Within a request, statements are grouped by their normalized text. When one shape
+  runs more than N_PLUS_ONE_THRESHOLD times the request is logged as a likely N+1.
+- S3 (botocore events), Twilio (its HTTP client) and Gemini calls are timed through
+  track_external().
+
+Metrics live in process memory, so each gunicorn worker reports its own numbers and a
+scrape sees whichever worker answered it. Rates and percentiles are still
+representative because requests are spread evenly across workers.
+"""
+from config import Config
+from flask import current_app, g, has_app_context, has_request_context, request
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import Counter as StatementCounter
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class _Metric:
+    def __init__(self, name, help_text, labelnames):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _labels(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter(_Metric):
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{self._labels(labels)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    def __init__(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = buckets
+        self._values = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, counts in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{self._labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{self._labels(labels, [('le', '+Inf')])} {counts[-2]}")
+                lines.append(f"{self.name}_sum{self._labels(labels)} {counts[-1]}")
+                lines.append(f"{self.name}_count{self._labels(labels)} {counts[-2]}")
+        return lines
+
+
+REGISTRY = []
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Request handling time.', ('method', 'endpoint', 'status'))
+request_queries = Histogram(
+    'http_request_db_queries', 'SQL statements run per request.', ('endpoint',), QUERY_COUNT_BUCKETS)
+request_db_time = Histogram(
+    'http_request_db_seconds', 'SQL time per request.', ('endpoint',))
+query_duration = Histogram(
+    'db_query_duration_seconds', 'SQL statement execution time.', ('endpoint',))
+slow_queries = Counter(
+    'db_slow_queries_total', 'SQL statements slower than SLOW_QUERY_THRESHOLD.', ('endpoint',))
+n_plus_one = Counter(
+    'db_n_plus_one_total', 'Requests that repeated one statement shape more than N_PLUS_ONE_THRESHOLD times.',
+    ('endpoint',))
+external_duration = Histogram(
+    'external_call_duration_seconds', 'Time spent in calls to external services.', ('service', 'operation', 'outcome'))
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _setting(name):
+    # The running app's config when there is one, so create_app() overrides apply
+    if has_app_context():
+        return current_app.config.get(name, getattr(Config, name))
+    return getattr(Config, name)
+
+
+def _endpoint():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return '-'
+
+
+def _request_stats():
+    return g.get('_metrics') if has_request_context() else None
+
+
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_statement(statement):
+    """
+    Statement shape used for N+1 detection: whitespace collapsed and expanded IN lists
+    reduced to one placeholder, so "WHERE id IN (?, ?, ?)" matches "WHERE id IN (?)".
+    """
+    return _IN_LIST.sub('(?)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.external_time = 0.0
+        self.statements = StatementCounter()
+
+
+# Engine events apply to every engine, including the workers' and the scheduler's
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_started'].pop()
+    elapsed = time.perf_counter() - started
+    endpoint = _endpoint()
+    query_duration.observe((endpoint,), elapsed)
+
+    stats = _request_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+        stats.statements[normalize_statement(statement)] += 1
+
+    if elapsed >= _setting('SLOW_QUERY_THRESHOLD'):
+        slow_queries.inc((endpoint,))
+        logger.warning("Slow query (%.3fs) in %s: %s", elapsed, endpoint, statement[:500],
+                       extra={"elapsed": elapsed, "endpoint": endpoint})
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    if context.connection is not None:
+        pending = context.connection.info.get('metrics_started')
+        if pending:
+            pending.pop()
+
+
+@contextmanager
+def track_external(service, operation):
+    """
+    Time a call to an external service (S3, Twilio, Gemini) and charge it to the
+    current request.
+    """
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        record_external(service, operation, outcome, time.perf_counter() - started)
+
+
+def record_external(service, operation, outcome, elapsed):
+    external_duration.observe((service, operation, outcome), elapsed)
+    stats = _request_stats()
+    if stats is not None:
+        stats.external_time += elapsed
+
+
+def instrument_boto3_client(client, service):
+    """
+    Time every API call a boto3 client makes through its event hooks.
+    """
+    def before_call(model, context, **kwargs):
+        context['metrics_started'] = time.perf_counter()
+
+    def after_call(model, context, **kwargs):
+        started = context.pop('metrics_started', None)
+        if started is not None:
+            record_external(service, model.name, 'ok', time.perf_counter() - started)
+
+    def after_call_error(context, exception, **kwargs):
+        started = context.pop('metrics_started', None)
+        if started is not None:
+            record_external(service, '-', 'error', time.perf_counter() - started)
+
+    client.meta.events.register(f'before-call.{service}', before_call)
+    client.meta.events.register(f'after-call.{service}', after_call)
+    client.meta.events.register(f'after-call-error.{service}', after_call_error)
+    return client
+
+
+def instrument_blueprint(blueprint):
+    """
+    Register the per-request hooks on a Blueprint.
+    """
+    @blueprint.before_request
+    def start_request_metrics():
+        g._metrics = RequestStats()
+
+    @blueprint.after_request
+    def finish_request_metrics(response):
+        stats = g.pop('_metrics', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        endpoint = _endpoint()
+
+        request_duration.observe((request.method, endpoint, str(response.status_code)), elapsed)
+        request_queries.observe((endpoint,), stats.queries)
+        request_db_time.observe((endpoint,), stats.db_time)
+
+        threshold = _setting('N_PLUS_ONE_THRESHOLD')
+        repeated = [(statement, count) for statement, count in stats.statements.items() if count > threshold]
+        if repeated:
+            n_plus_one.inc((endpoint,))
+            statement, count = max(repeated, key=lambda item: item[1])
+            logger.warning("Possible N+1 in %s %s: %d runs of %s", request.method, endpoint, count, statement[:500],
+                           extra={"endpoint": endpoint, "repeats": count, "queries": stats.queries})
+
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, '
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f'ext;dur={stats.external_time * 1000:.1f}'
+        )
+        logger.debug("%s %s %s in %.1fms (%d queries, %.1fms SQL, %.1fms external)",
+                     request.method, endpoint, response.status_code, elapsed * 1000,
+                     stats.queries, stats.db_time * 1000, stats.external_time * 1000,
+                     extra={"duration": elapsed, "queries": stats.queries, "db_time": stats.db_time,
+                            "external_time": stats.external_time})
+        return response
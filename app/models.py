@@ -24,61 +24,289 @@ class Listing(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    starting_price = db.Column(db.Float, nullable=False)
-    current_price = db.Column(db.Float, nullable=False)
+    # Money is fixed-point: DECIMAL(12, 2), loaded as Decimal
+    starting_price = db.Column(db.Numeric(12, 2), nullable=False)
+    current_price = db.Column(db.Numeric(12, 2), nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
     image_url = db.Column(db.String(255), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     is_active = db.Column(db.Boolean, default=True)  # To mark if the listing is active or not
+    # Denormalized winning-bid pointer, maintained by the bid engine (app/bidding.py).
+    # highest_bid_id has no FK constraint because bid already references listing.
+    highest_bid_id = db.Column(db.Integer, nullable=True)
+    highest_bidder_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    bid_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Resized copies of image_url, filled in by the image worker (app/images.py)
+    thumb_url = db.Column(db.String(255), nullable=True)
+    medium_url = db.Column(db.String(255), nullable=True)
+    # Log of the exponentially decayed bid count, bumped by the bid engine; NULL until the first bid (app/leaderboards.py)
+    trend_score = db.Column(db.Double, nullable=True)
+
+    # Composite indexes backing the keyset-paginated GET /listings
+    __table_args__ = (
+        db.Index('ix_listing_end_time_id', 'end_time', 'id'),
+        db.Index('ix_listing_active_end_time_id', 'is_active', 'end_time', 'id'),
+        db.Index('ix_listing_active_id', 'is_active', 'id'),
+        db.Index('ix_listing_user_end_time_id', 'user_id', 'end_time', 'id'),
+        db.Index('ix_listing_image_url', 'image_url'),
+        db.Index('ix_listing_active_trend_score_id', 'is_active', 'trend_score', 'id'),
+        # Full-text search (app/search.py); SQLite uses the listing_fts table instead
+        db.Index('ft_listing_title_description', 'title', 'description', mysql_prefix='FULLTEXT')
+        .ddl_if(dialect='mysql'),
+    )
 
     # Equivalent Raw SQL:
     # CREATE TABLE listings (
     #     id INT AUTO_INCREMENT PRIMARY KEY,
     #     title VARCHAR(200) NOT NULL,
     #     description TEXT NOT NULL,
-    #     starting_price FLOAT NOT NULL,
-    #     current_price FLOAT NOT NULL,
+    #     starting_price DECIMAL(12, 2) NOT NULL,
+    #     current_price DECIMAL(12, 2) NOT NULL,
     #     end_time DATETIME NOT NULL,
     #     image_url VARCHAR(255),
     #     user_id INT NOT NULL,
     #     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    #     FOREIGN KEY (user_id) REFERENCES users(id)
+    #     is_active BOOLEAN DEFAULT TRUE,
+    #     highest_bid_id INT,
+    #     highest_bidder_id INT,
+    #     bid_count INT NOT NULL DEFAULT 0,
+    #     thumb_url VARCHAR(255),
+    #     medium_url VARCHAR(255),
+    #     trend_score DOUBLE,
+    #     FOREIGN KEY (user_id) REFERENCES users(id),
+    #     FOREIGN KEY (highest_bidder_id) REFERENCES users(id)
     # );
+    # CREATE INDEX ix_listing_end_time_id ON listings (end_time, id);
+    # CREATE INDEX ix_listing_active_end_time_id ON listings (is_active, end_time, id);
+    # CREATE INDEX ix_listing_active_id ON listings (is_active, id);
+    # CREATE INDEX ix_listing_user_end_time_id ON listings (user_id, end_time, id);
+    # CREATE INDEX ix_listing_image_url ON listings (image_url);
+    # CREATE INDEX ix_listing_active_trend_score_id ON listings (is_active, trend_score, id);
+    # CREATE FULLTEXT INDEX ft_listing_title_description ON listings (title, description);  -- app/search.py
 
 # Bid Model
 class Bid(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(db.Numeric(12, 2), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     listing_id = db.Column(db.Integer, db.ForeignKey('listing.id'), nullable=False)
     timestamp = db.Column(db.DateTime, server_default=db.func.now())
 
+    # Bid history and highest-bid lookups per listing
+    __table_args__ = (
+        db.Index('ix_bid_listing_id_amount', 'listing_id', 'amount'),
+    )
+
     # Equivalent Raw SQL:
     # CREATE TABLE bids (
     #     id INT AUTO_INCREMENT PRIMARY KEY,
-    #     amount FLOAT NOT NULL,
+    #     amount DECIMAL(12, 2) NOT NULL,
     #     user_id INT NOT NULL,
     #     listing_id INT NOT NULL,
     #     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     #     FOREIGN KEY (user_id) REFERENCES users(id),
     #     FOREIGN KEY (listing_id) REFERENCES listings(id)
     # );
+    # CREATE INDEX ix_bid_listing_id_amount ON bids (listing_id, amount);
+
+# Proxy Bid Model: a bidder's hidden maximum on a listing, bid up automatically by app/bidding.py
+class ProxyBid(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    listing_id = db.Column(db.Integer, db.ForeignKey('listing.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    max_amount = db.Column(db.Numeric(12, 2), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    # One maximum per bidder per listing; also serves the leader's lookup
+    __table_args__ = (
+        db.UniqueConstraint('listing_id', 'user_id', name='uq_proxy_bid_listing_id_user_id'),
+    )
+
+    # Equivalent Raw SQL:
+    # CREATE TABLE proxy_bids (
+    #     id INT AUTO_INCREMENT PRIMARY KEY,
+    #     listing_id INT NOT NULL,
+    #     user_id INT NOT NULL,
+    #     max_amount DECIMAL(12, 2) NOT NULL,
+    #     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    #     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    #     FOREIGN KEY (listing_id) REFERENCES listings(id),
+    #     FOREIGN KEY (user_id) REFERENCES users(id),
+    #     UNIQUE KEY uq_proxy_bid_listing_id_user_id (listing_id, user_id)
+    # );
 
 # Notification Model
 class Notification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     message = db.Column(db.String(255), nullable=False)
-    is_read = db.Column(db.Boolean, default=False)
+    is_read = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    # What the notification is about, so repeats can be compacted (app/retention.py).
+    # kind is one of new_bid, outbid, listing_ended or listing_won; NULL for older rows.
+    listing_id = db.Column(db.Integer, db.ForeignKey('listing.id'), nullable=True)
+    kind = db.Column(db.String(20), nullable=True)
+    repeat_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Events this row stands for
+
+    # Backs the unread-first feed (keyset on id within each is_read group) and the unread count
+    __table_args__ = (
+        db.Index('ix_notification_user_id_is_read_id', 'user_id', 'is_read', 'id'),
+        db.Index('ix_notification_is_read_created_at', 'is_read', 'created_at'),
+        db.Index('ix_notification_listing_id_kind', 'listing_id', 'kind'),
+    )
 
     # Equivalent Raw SQL:
     # CREATE TABLE notifications (
     #     id INT AUTO_INCREMENT PRIMARY KEY,
     #     user_id INT NOT NULL,
     #     message VARCHAR(255) NOT NULL,
-    #     is_read BOOLEAN DEFAULT FALSE,
+    #     is_read BOOLEAN NOT NULL DEFAULT FALSE,
     #     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    #     listing_id INT,
+    #     kind VARCHAR(20),
+    #     repeat_count INT NOT NULL DEFAULT 1,
+    #     FOREIGN KEY (user_id) REFERENCES users(id),
+    #     FOREIGN KEY (listing_id) REFERENCES listings(id)
+    # );
+    # CREATE INDEX ix_notification_user_id_is_read_id ON notifications (user_id, is_read, id);
+    # CREATE INDEX ix_notification_is_read_created_at ON notifications (is_read, created_at);
+    # CREATE INDEX ix_notification_listing_id_kind ON notifications (listing_id, kind);
+
+# Notification Archive Model (read notifications moved out of notification by app/retention.py)
+class NotificationArchive(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # The original notification id
+    user_id = db.Column(db.Integer, nullable=False)
+    message = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=True)
+    listing_id = db.Column(db.Integer, nullable=True)
+    kind = db.Column(db.String(20), nullable=True)
+    repeat_count = db.Column(db.Integer, nullable=False, default=1)
+    archived_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        db.Index('ix_notification_archive_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+    # Equivalent Raw SQL:
+    # CREATE TABLE notification_archives (
+    #     id INT PRIMARY KEY,
+    #     user_id INT NOT NULL,
+    #     message VARCHAR(255) NOT NULL,
+    #     created_at DATETIME,
+    #     listing_id INT,
+    #     kind VARCHAR(20),
+    #     repeat_count INT NOT NULL DEFAULT 1,
+    #     archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    # );
+    # CREATE INDEX ix_notification_archive_user_id_created_at ON notification_archives (user_id, created_at);
+
+# Outbox Model (transactional outbox for SMS, drained by app/outbox.py)
+class OutboxMessage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(20), nullable=False, default='sms')
+    recipient = db.Column(db.String(32), nullable=False)
+    body = db.Column(db.String(1600), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sent or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    last_error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_outbox_message_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    # Equivalent Raw SQL:
+    # CREATE TABLE outbox_messages (
+    #     id INT AUTO_INCREMENT PRIMARY KEY,
+    #     channel VARCHAR(20) NOT NULL DEFAULT 'sms',
+    #     recipient VARCHAR(32) NOT NULL,
+    #     body VARCHAR(1600) NOT NULL,
+    #     status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    #     attempts INT NOT NULL DEFAULT 0,
+    #     next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    #     last_error VARCHAR(255),
+    #     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    #     sent_at DATETIME
+    # );
+    # CREATE INDEX ix_outbox_message_status_next_attempt_at ON outbox_messages (status, next_attempt_at);
+
+# Image Asset Model (one uploaded image and its derivatives, processed by app/images.py)
+class ImageAsset(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(255), unique=True, nullable=False)  # Original upload, as stored in listing.image_url
+    s3_key = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, ready or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    last_error = db.Column(db.String(255), nullable=True)
+    thumb_url = db.Column(db.String(255), nullable=True)
+    medium_url = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_image_asset_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    # Equivalent Raw SQL:
+    # CREATE TABLE image_assets (
+    #     id INT AUTO_INCREMENT PRIMARY KEY,
+    #     url VARCHAR(255) NOT NULL UNIQUE,
+    #     s3_key VARCHAR(255) NOT NULL,
+    #     status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    #     attempts INT NOT NULL DEFAULT 0,
+    #     next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    #     last_error VARCHAR(255),
+    #     thumb_url VARCHAR(255),
+    #     medium_url VARCHAR(255),
+    #     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    #     processed_at DATETIME
+    # );
+    # CREATE INDEX ix_image_asset_status_next_attempt_at ON image_assets (status, next_attempt_at);
+
+# Generation Job Model (asynchronous AI listing generation, processed by app/ai_jobs.py)
+class GenerationJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # Random hex id handed to the client
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded or failed
+    image_key = db.Column(db.String(255), nullable=False)  # S3 key of the photo
+    image_sha256 = db.Column(db.String(64), nullable=True)
+    title = db.Column(db.String(200), nullable=True)
+    description = db.Column(db.Text, nullable=True)
+    starting_price = db.Column(db.Numeric(12, 2), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    last_error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_generation_job_status_next_attempt_at', 'status', 'next_attempt_at'),
+        db.Index('ix_generation_job_image_sha256', 'image_sha256'),
+    )
+
+    # Equivalent Raw SQL:
+    # CREATE TABLE generation_jobs (
+    #     id VARCHAR(32) PRIMARY KEY,
+    #     user_id INT NOT NULL,
+    #     status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    #     image_key VARCHAR(255) NOT NULL,
+    #     image_sha256 VARCHAR(64),
+    #     title VARCHAR(200),
+    #     description TEXT,
+    #     starting_price DECIMAL(12, 2),
+    #     attempts INT NOT NULL DEFAULT 0,
+    #     next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    #     last_error VARCHAR(255),
+    #     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    #     started_at DATETIME,
+    #     finished_at DATETIME,
     #     FOREIGN KEY (user_id) REFERENCES users(id)
-    # );
\ No newline at end of file
+    # );
+    # CREATE INDEX ix_generation_job_status_next_attempt_at ON generation_jobs (status, next_attempt_at);
+    # CREATE INDEX ix_generation_job_image_sha256 ON generation_jobs (image_sha256);
@@ -0,0 +1,204 @@
+"""
+Transactional SMS outbox.
+
+Request handlers never talk to Twilio. They call enqueue_sms(), which only adds an
+OutboxMessage row to the current session, so the message is committed (or rolled
+back) together with the Bid/Notification rows it belongs to. A separate dispatcher
+process drains the table:
+
+    python -m app.outbox
+"""
+import os
+from app import db
+from app.clients import get_twilio_client
+from app.models import OutboxMessage
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import insert, update
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed message is hidden from other dispatchers while it is being sent
+CLAIM_LEASE = timedelta(seconds=60)
+# Retry backoff: BACKOFF_BASE * 2 ** (attempts - 1), capped, plus jitter
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 300.0
+
+
+def enqueue_sms(to, message):
+    """
+    Queue an SMS in the current transaction. Nothing is sent until the caller commits.
+    """
+    if not to:
+        return None
+    outbox_message = OutboxMessage(channel='sms', recipient=to, body=message, status='pending')
+    db.session.add(outbox_message)
+    return outbox_message
+
+
+def enqueue_sms_many(messages):
+    """
+    Queue many (to, message) pairs in the current transaction with one bulk INSERT.
+    """
+    rows = [
+        {"channel": 'sms', "recipient": to, "body": message, "status": 'pending', "attempts": 0}
+        for to, message in messages
+        if to
+    ]
+    if rows:
+        db.session.execute(insert(OutboxMessage), rows)
+    return len(rows)
+
+
+class TwilioTransport:
+    """
+    Sends SMS through the process-wide Twilio client (app/clients.py).
+    """
+    def __init__(self, from_number=None):
+        self.client = get_twilio_client()
+        self.from_number = from_number or os.getenv("TWILIO_PHONE_NUMBER")
+
+    def send(self, to, body):
+        return self.client.messages.create(body=body, from_=self.from_number, to=to).sid
+
+
+class FakeTransport:
+    """
+    In-memory transport for offline runs. Records every message and can be told to
+    fail for specific recipients.
+    """
+    def __init__(self, fail_for=()):
+        self.sent = []
+        self.fail_for = set(fail_for)
+
+    def send(self, to, body):
+        if to in self.fail_for:
+            raise RuntimeError(f"Fake delivery failure for {to}")
+        self.sent.append((to, body))
+        return f"fake-{len(self.sent)}"
+
+
+class OutboxDispatcher:
+    """
+    Claims due messages in batches, sends them on a bounded thread pool and records the
+    outcome. Failed messages are retried with exponential backoff until max_attempts.
+    """
+    def __init__(self, transport, batch_size=100, max_workers=8, max_attempts=5):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="outbox")
+
+    def claim_batch(self):
+        """
+        Lease up to batch_size due messages by pushing their next_attempt_at into the
+        future. SKIP LOCKED lets several dispatchers run side by side on MySQL.
+        Returns (id, recipient, body, attempts) tuples.
+        """
+        now = datetime.utcnow()
+        messages = (
+            OutboxMessage.query
+            .filter(OutboxMessage.status == 'pending', OutboxMessage.next_attempt_at <= now)
+            .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        claimed = [(message.id, message.recipient, message.body, message.attempts) for message in messages]
+        if claimed:
+            db.session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_([message_id for message_id, _, _, _ in claimed]))
+                .values(next_attempt_at=now + CLAIM_LEASE)
+            )
+        db.session.commit()
+        return claimed
+
+    def _send(self, recipient, body):
+        # Runs on the pool; no database access here
+        try:
+            self.transport.send(recipient, body)
+            return None
+        except Exception as e:
+            return str(e)
+
+    def drain_once(self):
+        """
+        Send one batch. Returns the number of messages attempted.
+        """
+        claimed = self.claim_batch()
+        if not claimed:
+            return 0
+
+        futures = [
+            (message_id, attempts, self.executor.submit(self._send, recipient, body))
+            for message_id, recipient, body, attempts in claimed
+        ]
+        now = datetime.utcnow()
+        sent_ids = []
+        failed = 0
+        for message_id, attempts, future in futures:
+            error = future.result()
+            if error is None:
+                sent_ids.append(message_id)
+                continue
+
+            failed += 1
+            attempts += 1
+            values = {"attempts": attempts, "last_error": error[:255]}
+            if attempts >= self.max_attempts:
+                values["status"] = 'failed'
+                logger.error("Giving up on outbox message %s after %d attempts: %s", message_id, attempts, error)
+            else:
+                delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+                values["next_attempt_at"] = now + timedelta(seconds=delay * random.uniform(1.0, 1.5))
+            db.session.execute(update(OutboxMessage).where(OutboxMessage.id == message_id).values(**values))
+
+        # Successes are recorded with a single statement
+        if sent_ids:
+            db.session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(sent_ids))
+                .values(status='sent', sent_at=now, attempts=OutboxMessage.attempts + 1)
+            )
+        db.session.commit()
+
+        logger.info("Outbox batch: %d sent, %d failed", len(sent_ids), failed)
+        return len(claimed)
+
+    def run_forever(self, poll_interval=1.0):
+        logger.info("Outbox dispatcher started")
+        try:
+            while True:
+                try:
+                    attempted = self.drain_once()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Outbox batch failed")
+                    attempted = 0
+                # Keep draining while there is a backlog; only sleep when idle
+                if attempted < self.batch_size:
+                    time.sleep(poll_interval)
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def main():
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        dispatcher = OutboxDispatcher(
+            TwilioTransport(),
+            batch_size=app.config['OUTBOX_BATCH_SIZE'],
+            max_workers=app.config['OUTBOX_MAX_WORKERS'],
+            max_attempts=app.config['OUTBOX_MAX_ATTEMPTS']
+        )
+        dispatcher.run_forever(app.config['OUTBOX_POLL_INTERVAL'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Notification retention: compaction of repeated notifications and removal of old
+read ones.
+
+A run has two phases, each done in small chunks with a commit per chunk so no
+statement holds many row locks or runs for long:
+
+1. Compact. For each listing, a user's repeated "new bid" (seller) or "outbid"
+   notifications collapse into the newest one, which is rewritten to say how many
+   events it stands for. It stays unread if any of the merged rows was unread.
+2. Purge. Read notifications older than NOTIFICATION_RETENTION_DAYS are deleted,
+   or copied to notification_archive first when NOTIFICATION_ARCHIVE is set.
+
+The expiry scheduler (app/scheduler_worker.py) starts a run every
+NOTIFICATION_RETENTION_INTERVAL seconds and advances it one chunk per loop, so
+closing auctions is never delayed behind a long purge. To run one to completion
+by hand:
+
+    python -m app.retention
+"""
+from app import db
+from app.models import Listing, Notification, NotificationArchive
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, insert, func
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# kind -> message for a row standing for `count` events on listing `title`
+COMPACTED_MESSAGES = {
+    'new_bid': "{count} new bids have been placed on your listing: {title}",
+    'outbid': "You have been outbid {count} times on {title}.",
+}
+
+
+class NotificationRetention:
+    """
+    One retention run at a time, advanced with step().
+    """
+    def __init__(self, max_age_days=30, chunk_size=1000, archive=False, listings_per_chunk=200):
+        self.max_age = timedelta(days=max_age_days)
+        self.chunk_size = chunk_size
+        self.archive = archive
+        self.listings_per_chunk = listings_per_chunk
+        self.phase = None  # None (idle), 'compact' or 'purge'
+
+    @property
+    def running(self):
+        return self.phase is not None
+
+    def start(self):
+        self.phase = 'compact'
+        self.cutoff = datetime.utcnow() - self.max_age
+        self.listing_cursor = 0
+        self.started = time.perf_counter()
+        self.totals = {"compacted": 0, "deleted": 0, "archived": 0, "chunks": 0}
+        logger.info("Notification retention started (cutoff %s)", self.cutoff.isoformat())
+
+    def step(self):
+        """
+        Process one chunk of the current phase. Returns True while work remains.
+        """
+        if self.phase == 'compact':
+            if not self.compact_chunk():
+                self.phase = 'purge'
+        elif self.phase == 'purge':
+            if not self.purge_chunk():
+                self.finish()
+        return self.running
+
+    def run(self):
+        """
+        A whole run, start to finish. Returns the totals.
+        """
+        self.start()
+        while self.step():
+            pass
+        return self.totals
+
+    def finish(self):
+        self.phase = None
+        elapsed = time.perf_counter() - self.started
+        removed = self.totals["compacted"] + self.totals["deleted"]
+        logger.info(
+            "Notification retention finished in %.1fs: %d compacted, %d deleted (%d archived), %.0f rows/s",
+            elapsed, self.totals['compacted'], self.totals['deleted'], self.totals['archived'],
+            removed / elapsed if elapsed > 0 else 0.0,
+            extra=dict(self.totals, elapsed=elapsed)
+        )
+
+    def abort(self):
+        self.phase = None
+        logger.warning("Notification retention aborted after %d chunks", self.totals['chunks'])
+
+    def _progress(self, action, count):
+        self.totals["chunks"] += 1
+        self.totals[action] += count
+        logger.debug("Retention %s chunk: %d rows (%s)", self.phase, count, self.totals,
+                     extra=dict(self.totals, phase=self.phase))
+
+    def compact_chunk(self):
+        """
+        Compact the notifications of the next listings_per_chunk listings that have any.
+        Returns False once every listing has been visited.
+        """
+        kinds = list(COMPACTED_MESSAGES)
+        listing_ids = db.session.execute(
+            select(Notification.listing_id)
+            .where(Notification.listing_id > self.listing_cursor, Notification.kind.in_(kinds))
+            .group_by(Notification.listing_id)
+            .order_by(Notification.listing_id)
+            .limit(self.listings_per_chunk)
+        ).scalars().all()
+        if not listing_ids:
+            db.session.rollback()
+            return False
+        self.listing_cursor = listing_ids[-1]
+
+        # (listing, user, kind) groups with more than one row
+        groups = db.session.execute(
+            select(
+                Notification.listing_id,
+                Notification.user_id,
+                Notification.kind,
+                func.count().label('rows'),
+                func.sum(Notification.repeat_count).label('events'),
+                func.max(Notification.id).label('newest_id'),
+                func.min(Notification.is_read).label('all_read'),
+                Listing.title
+            )
+            .join(Listing, Listing.id == Notification.listing_id)
+            .where(Notification.listing_id.in_(listing_ids), Notification.kind.in_(kinds))
+            .group_by(Notification.listing_id, Notification.user_id, Notification.kind, Listing.title)
+            .having(func.count() > 1)
+        ).all()
+
+        removed = 0
+        for group in groups:
+            message = COMPACTED_MESSAGES[group.kind].format(count=group.events, title=group.title)[:255]
+            db.session.execute(
+                update(Notification)
+                .where(Notification.id == group.newest_id)
+                .values(message=message, repeat_count=group.events, is_read=bool(group.all_read))
+            )
+            # Only rows seen by the aggregate; anything inserted since has a higher id
+            result = db.session.execute(
+                delete(Notification)
+                .where(
+                    Notification.listing_id == group.listing_id,
+                    Notification.user_id == group.user_id,
+                    Notification.kind == group.kind,
+                    Notification.id < group.newest_id
+                )
+                .execution_options(synchronize_session=False)
+            )
+            removed += result.rowcount
+        db.session.commit()
+        self._progress("compacted", removed)
+        return True
+
+    def purge_chunk(self):
+        """
+        Delete (or archive) up to chunk_size read notifications older than the cutoff.
+        Returns False when none are left.
+        """
+        ids = db.session.execute(
+            select(Notification.id)
+            .where(Notification.is_read == True, Notification.created_at < self.cutoff)
+            .order_by(Notification.created_at)
+            .limit(self.chunk_size)
+        ).scalars().all()
+        if not ids:
+            db.session.rollback()
+            return False
+
+        if self.archive:
+            db.session.execute(
+                insert(NotificationArchive).from_select(
+                    ['id', 'user_id', 'message', 'created_at', 'listing_id', 'kind', 'repeat_count'],
+                    select(
+                        Notification.id, Notification.user_id, Notification.message, Notification.created_at,
+                        Notification.listing_id, Notification.kind, Notification.repeat_count
+                    ).where(Notification.id.in_(ids))
+                )
+            )
+        result = db.session.execute(
+            delete(Notification)
+            .where(Notification.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if self.archive:
+            self.totals["archived"] += result.rowcount
+        self._progress("deleted", result.rowcount)
+        return len(ids) == self.chunk_size
+
+
+def main():
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        retention = NotificationRetention(
+            max_age_days=app.config['NOTIFICATION_RETENTION_DAYS'],
+            chunk_size=app.config['NOTIFICATION_RETENTION_CHUNK_SIZE'],
+            archive=app.config['NOTIFICATION_ARCHIVE']
+        )
+        retention.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,54 @@
-from flask import Blueprint, jsonify, request
-from app.models import User, Listing, Bid, Notification
+from flask import Blueprint, Response, jsonify, request
+from app.models import User, Listing, Bid, Notification, GenerationJob
 from app import db
 from werkzeug.security import generate_password_hash, check_password_hash
-import boto3
 from flask import current_app
 from app.utils import (
     get_s3_client, 
     send_sms, 
     check_expired_listings,
     create_presigned_url, 
-    require_auth
+    require_auth,
+    encode_cursor,
+    decode_cursor,
+    parse_bool
 )
+from app.bidding import submit_bid, submit_max_bid, BidError
+from app.cache import bid_history_cache, listing_summary_cache, get_listing_version, conditional_json_response
+from app.events import bid_events, bid_event
+from app.uploads import stream_to_s3, UploadError
+from app.images import enqueue_image, derivative_urls, s3_key_for_url
+from app.ai import get_listing_generator, GenerationError
+from app.ai_jobs import enqueue_generation_job, job_payload, queue_stats
+from app.search import search_listings, SearchError
+from app.validation import LISTING_SCHEMA, BID_SCHEMA, MAX_BID_SCHEMA, ValidationError, parse_money
+from app.leaderboards import (
+    ending_soon,
+    trending,
+    leaderboard_cache,
+    DEFAULT_LEADERBOARD_SIZE,
+    MAX_LEADERBOARD_SIZE
+)
+from app.metrics import instrument_blueprint, render as render_metrics
+from sqlalchemy import and_, or_, select, update, func, true
+from sqlalchemy.orm import load_only
 import os
+import logging
+from uuid import uuid4
 from datetime import datetime, timedelta, timezone
 import jwt
+import json
+import time
 import base64
-import google.generativeai as genai
 from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 load_dotenv()
 
 main = Blueprint('main', __name__)
+logger = logging.getLogger(__name__)
+
+# Request duration, SQL and external-call timing for every route below (app/metrics.py)
+instrument_blueprint(main)
 
 
 @main.route('/')
@@ -36,65 +64,203 @@ def home():
    
    
    
-# Fetch all listings  
+# Fields GET /listings can return; pass ?fields=id,title,... to project a subset
+LISTING_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "starting_price",
+    "current_price",
+    "end_time",
+    "user_id",
+    "image_url",
+    "thumb_url",  # 320px derivative; null until the image worker has processed image_url
+    "medium_url",
+    "is_active",
+)
+# Fields returned when no ?fields= projection is given
+DEFAULT_LISTING_FIELDS = tuple(field for field in LISTING_FIELDS if field != "medium_url")
+
+# Keyset sort orders: name -> (column, descending)
+LISTING_SORTS = {
+    "end_time": (Listing.end_time, False),  # Ending soonest first
+    # Newest first. Ids grow with created_at, which is a one-second server_default (stored
+    # on SQLite in a different format than a bound datetime) and cannot serve as a key
+    "created_at": (Listing.id, True),
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+# Fetch a page of listings
 @main.route('/listings', methods=['GET'])
 def get_listings():
     try:
-        # Fetch all listings
-        listings = Listing.query.all()
+        limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+
+        sort = request.args.get('sort', 'end_time')
+        if sort not in LISTING_SORTS:
+            return jsonify({"error": f"Invalid sort: {sort}"}), 400
+        sort_column, descending = LISTING_SORTS[sort]
+
+        fields = DEFAULT_LISTING_FIELDS
+        if request.args.get('fields'):
+            fields = tuple(field.strip() for field in request.args['fields'].split(',') if field.strip())
+            unknown = [field for field in fields if field not in LISTING_FIELDS]
+            if unknown:
+                return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+        # Only load the projected columns (plus the keyset columns) so list views skip description
+        loaded = {"id", sort_column.key} | set(fields)
+        query = Listing.query.options(load_only(*[getattr(Listing, name) for name in loaded]))
+
+        # Filters
+        if request.args.get('is_active') is not None:
+            query = query.filter(Listing.is_active == parse_bool(request.args['is_active']))
+        if request.args.get('user_id') is not None:
+            query = query.filter(Listing.user_id == int(request.args['user_id']))
+        if request.args.get('min_price') is not None:
+            min_price, error = parse_money(request.args['min_price'], allow_zero=True)
+            if error:
+                return jsonify({"error": f"min_price {error}"}), 400
+            query = query.filter(Listing.current_price >= min_price)
+        if request.args.get('max_price') is not None:
+            max_price, error = parse_money(request.args['max_price'], allow_zero=True)
+            if error:
+                return jsonify({"error": f"max_price {error}"}), 400
+            query = query.filter(Listing.current_price <= max_price)
+
+        # Resume after the last row of the previous page
+        if request.args.get('cursor'):
+            last_value, last_id = decode_cursor(request.args['cursor'])
+            if sort_column is not Listing.id:
+                last_value = datetime.fromisoformat(last_value)
+            if descending:
+                query = query.filter(or_(
+                    sort_column < last_value,
+                    and_(sort_column == last_value, Listing.id < last_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    sort_column > last_value,
+                    and_(sort_column == last_value, Listing.id > last_id)
+                ))
+
+        if descending:
+            query = query.order_by(sort_column.desc(), Listing.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), Listing.id.asc())
+
+        # Fetch one extra row to know whether there is another page
+        listings = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(listings) > limit:
+            listings = listings[:limit]
+            last = listings[-1]
+            next_cursor = encode_cursor(getattr(last, sort_column.key), last.id)
+
         # Return a JSON response with listing data, including image URLs
         return jsonify({
             "listings": [
-                {
-                    "id": listing.id,
-                    "title": listing.title,
-                    "description": listing.description,
-                    "starting_price": listing.starting_price,
-                    "current_price": listing.current_price,
-                    "end_time": listing.end_time,
-                    "user_id": listing.user_id,
-                    "image_url": listing.image_url,  # Include the image URL
-                    "is_active": listing.is_active
-                }
+                {field: getattr(listing, field) for field in fields}
                 for listing in listings
-            ]
+            ],
+            "next_cursor": next_cursor
         })
     except Exception as e:
-        # Handle any exceptions that occur during the query
+        # Handle any exceptions that occur during the query (including bad filters or cursors)
         return jsonify({"error": str(e)}), 400
     
+# Full-text search over titles and descriptions, best match first (app/search.py)
+@main.route('/listings/search', methods=['GET'])
+def search_listings_route():
+    try:
+        limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+
+        fields = DEFAULT_LISTING_FIELDS
+        if request.args.get('fields'):
+            fields = tuple(field.strip() for field in request.args['fields'].split(',') if field.strip())
+            unknown = [field for field in fields if field not in LISTING_FIELDS]
+            if unknown:
+                return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+        is_active = None
+        if request.args.get('is_active') is not None:
+            is_active = parse_bool(request.args['is_active'])
+
+        listings, next_cursor = search_listings(
+            request.args.get('q', ''), limit, fields, cursor=request.args.get('cursor'), is_active=is_active
+        )
+        return jsonify({"listings": listings, "next_cursor": next_cursor})
+    except SearchError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        # Bad filters or cursors
+        return jsonify({"error": str(e)}), 400
+
+# Ending-soon and trending boards, read off their indexes and cached briefly per worker (app/leaderboards.py)
+@main.route('/listings/ending-soon', methods=['GET'])
+def listings_ending_soon():
+    return leaderboard_response('ending_soon', ending_soon)
+
+
+@main.route('/listings/trending', methods=['GET'])
+def listings_trending():
+    return leaderboard_response('trending', trending)
+
+
+def leaderboard_response(board, build):
+    try:
+        limit = request.args.get('limit', DEFAULT_LEADERBOARD_SIZE, type=int)
+        limit = max(1, min(limit, MAX_LEADERBOARD_SIZE))
+
+        key = (board, limit)
+        body = leaderboard_cache.get(key)
+        if body is None:
+            body = current_app.json.dumps({"listings": build(limit)})
+            leaderboard_cache.set(key, body)
+        return current_app.response_class(body, mimetype='application/json')
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
 # Allow users to create a new listing
 @main.route('/listings', methods=['POST'])
 @require_auth
 def create_listing():
-    print(f"Content-Type: {request.content_type}")
-
     try:
         # Use the authenticated user's ID
         user_id = request.user_id
-        # Log the raw JSON data
-        data = request.get_json()
- 
+
+        # Reject bad input before touching the database (app/validation.py)
+        try:
+            data = LISTING_SCHEMA.validate(request.get_json(silent=True))
+        except ValidationError as e:
+            logger.debug("Invalid listing: %s", e.errors)
+            return jsonify({"error": str(e)}), e.status
 
         # Extract fields from the request
-        title = data.get('title')
-        description = data.get('description')
-        starting_price = data.get('starting_price')
-        end_time = data.get('end_time')
-        user_id = data.get('user_id')
+        title = data['title']
+        description = data['description']
+        starting_price = data['starting_price']
+        end_time = data['end_time']
+        user_id = data['user_id']
         image_url = data.get('image_url')  # Pre-signed S3 URL
 
         # Log extracted fields
-        print(f"Extracted Fields: title={title}, description={description}, starting_price={starting_price}, end_time={end_time}, user_id={user_id}, image_url={image_url}")
-
-        # Validate required fields
-        missing = [field for field in ['title', 'description', 'starting_price', 'end_time', 'user_id'] if not data.get(field)]
-        if missing:
-            print(f"Missing Fields: {missing}")
-            return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
+        logger.debug("Creating listing title=%s starting_price=%s end_time=%s user_id=%s image_url=%s",
+                     title, starting_price, end_time, user_id, image_url)
 
         # Save the listing to the database
         try:
+            # Images uploaded to our bucket get resized derivatives; reuse them if already rendered
+            thumb_url, medium_url = None, None
+            image_key = s3_key_for_url(image_url, current_app.config['S3_BUCKET'], current_app.config['S3_REGION'])
+            if image_key:
+                thumb_url, medium_url = derivative_urls(image_url)
+                if not thumb_url:
+                    enqueue_image(image_url, image_key)
+
             listing = Listing(
                 title=title,
                 description=description,
@@ -102,13 +268,15 @@ def create_listing():
                 current_price=starting_price,
                 end_time=end_time,
                 user_id=user_id,
-                image_url=image_url  # Save the S3 file path
+                image_url=image_url,  # Save the S3 file path
+                thumb_url=thumb_url,
+                medium_url=medium_url
             )
             db.session.add(listing)
             db.session.commit()
 
             # Log successful database save
-            print(f"Listing created successfully with ID: {listing.id}")
+            logger.info("Listing created successfully with ID: %s", listing.id)
 
             return jsonify({
                 "message": "Listing created successfully!",
@@ -118,12 +286,12 @@ def create_listing():
 
         except Exception as e:
             # Log database error
-            print(f"Database Error: {str(e)}")
+            logger.exception("Database error in create_listing")
             return jsonify({"error": f"Database error: {str(e)}"}), 500
 
     except Exception as e:
         # Log general error
-        print(f"Error in create_listing: {str(e)}")
+        logger.exception("Error in create_listing")
         return jsonify({"error": f"Error processing request: {str(e)}"}), 500
 
      
@@ -146,8 +314,10 @@ def get_listing(id):
             "current_price": listing.current_price,
             "end_time": listing.end_time,
             "user_id": listing.user_id,
-            "image_url": listing.image_url #Include the image URL
-             
+            "image_url": listing.image_url, #Include the image URL
+            "thumb_url": listing.thumb_url,
+            "medium_url": listing.medium_url
+
         })
     except Exception as e:
         # Handle any exceptions that occur during the query
@@ -157,113 +327,84 @@ def get_listing(id):
 @main.route('/bids', methods=['POST'])
 @require_auth
 def place_bid():
-    data = request.get_json()
     try:
-        # Use the authenticated user's ID
-        user_id = request.user_id
-        # Fetch the listing
-        listing = Listing.query.get(data['listing_id'])
-        if not listing:
-            return jsonify({"error": "Listing not found"}), 404
-
-        # Validate the bid amount > current price
-        if data['amount'] <= listing.current_price:
-            return jsonify({"error": "Bid must be higher than the current price"}), 400
-
-        # Fetch the previous highest bid (if any)
-        previous_highest_bid = Bid.query.filter_by(listing_id=data['listing_id']).order_by(Bid.amount.desc()).first()
-
-        # Check if the bidder is the seller
-        if listing.user_id == user_id:
-            return jsonify({"error": "You cannot bid on your own listing."}), 400
-
-        # Check if the user is outbidding themselves
-        if previous_highest_bid and previous_highest_bid.user_id == user_id:
-            pass  # Skip notification if the user is outbidding themselves
+        # Send amount for a bid of exactly that much, or max_amount for a proxy bid
+        # that the engine raises automatically up to that maximum
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict) and payload.get('max_amount') is not None:
+            if payload.get('amount') is not None:
+                return jsonify({"error": "Send amount or max_amount, not both"}), 400
+            data = MAX_BID_SCHEMA.validate(payload)
+            # Use the authenticated user's ID; the engine resolves competing maximums in one transaction
+            outcome = submit_max_bid(data['listing_id'], request.user_id, data['max_amount'])
         else:
-            # Notify the seller
-            seller = User.query.get(listing.user_id)  # Fetch the seller's details
-            seller_notification = Notification(
-                user_id=listing.user_id,
-                message=f"A new bid has been placed on your listing: {listing.title}",
-                is_read=False
-            )
-            db.session.add(seller_notification)
-
-            # Notify the seller via SMS
-            if seller and seller.phone_number:
-                send_sms(seller.phone_number, f"A new bid has been placed on your listing: {listing.title}")
-            else:
-                print("Seller does not have a valid phone number.")
-
-            # Notify the previous highest bidder (if applicable)
-            if previous_highest_bid:
-                previous_bidder = User.query.get(previous_highest_bid.user_id)  # Fetch the previous bidder's details
-                if previous_bidder.id != data['user_id']:  # Ensure the current bidder is not the previous bidder
-                    outbid_notification = Notification(
-                        user_id=previous_highest_bid.user_id,
-                        message=f"You have been outbid on {listing.title}.",
-                        is_read=False
-                    )
-                    db.session.add(outbid_notification)
-
-                    # Notify the previous highest bidder via SMS
-                    if previous_bidder and previous_bidder.phone_number:
-                        send_sms(previous_bidder.phone_number, f"You have been outbid on {listing.title}.")
-                    else:
-                        print("Previous bidder does not have a valid phone number.")
-
-        # Create the new bid object
-        new_bid = Bid(
-            amount=data['amount'],
-            user_id=user_id,
-            listing_id=data['listing_id']
-        )
-        db.session.add(new_bid)
-
-        # Update the current price of the listing
-        listing.current_price = data['amount']
-        db.session.commit()
-
-        return jsonify({"message": "Bid placed successfully!"}), 201
+            data = BID_SCHEMA.validate(payload)
+            # Use the authenticated user's ID; the engine does the atomic price check and update
+            outcome = submit_bid(data['listing_id'], request.user_id, data['amount'])
+
+        if outcome.bid is None and outcome.winning:
+            message = "Maximum bid updated"
+        elif outcome.winning:
+            message = "Bid placed successfully!"
+        else:
+            message = "You have been outbid by another bidder's maximum bid"
+        return jsonify({
+            "message": message,
+            "bid_id": outcome.bid.id if outcome.bid else None,
+            "winning": outcome.winning,
+            "current_price": outcome.current_price,
+            "end_time": outcome.end_time  # Later than before when the bid triggered a soft-close extension
+        }), 201
+    except (BidError, ValidationError) as e:
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 400
     
 # Get all bids for a specific listing    
 @main.route('/bids/<int:listing_id>', methods=['GET'])
 def get_bids_for_listing(listing_id):
     try:
-        # Fetch the listing by ID
-        listing = Listing.query.get(listing_id)
-        if not listing:
+        # Cheap version check first; unchanged polls get a 304 without loading any bids
+        version = get_listing_version(listing_id)
+        if version is None:
             return jsonify({"error": "Listing not found"}), 404
 
-        # Fetch all bids for the listing
-        bids = Bid.query.filter_by(listing_id=listing_id).all()
+        def build():
+            # Fetch the listing by ID
+            listing = db.session.get(Listing, listing_id)
 
-        # Prepare the bid history
-        bid_history = [
-            {
-                "id": None,  # No ID for the starting price
-                "amount": listing.starting_price,
-                "user_id": listing.user_id,  # The seller's user ID
-                "timestamp": listing.created_at.isoformat()  # Convert to ISO 8601
-            }
-        ] + [
-            {
-                "id": bid.id,
-                "amount": bid.amount,
-                "user_id": bid.user_id,
-                "timestamp": bid.timestamp.isoformat()  # Convert to ISO 8601
+            # Fetch all bids for the listing. Accepted bids strictly increase, so amount order
+            # is chronological order and is served by the (listing_id, amount) index
+            bids = Bid.query.filter_by(listing_id=listing_id).order_by(Bid.amount).all()
+
+            # Prepare the bid history
+            bid_history = [
+                {
+                    "id": None,  # No ID for the starting price
+                    "amount": listing.starting_price,
+                    "user_id": listing.user_id,  # The seller's user ID
+                    "timestamp": listing.created_at.isoformat()  # Convert to ISO 8601
+                }
+            ] + [
+                {
+                    "id": bid.id,
+                    "amount": bid.amount,
+                    "user_id": bid.user_id,
+                    "timestamp": bid.timestamp.isoformat()  # Convert to ISO 8601
+                }
+                for bid in bids
+            ]
+
+            return {
+                "listing_id": listing_id,
+                "bids": bid_history
             }
-            for bid in bids
-        ]
 
         # Return the bid history
-        return jsonify({
-            "listing_id": listing_id,
-            "bids": bid_history
-        })
+        return conditional_json_response(
+            bid_history_cache, ('bids', listing_id, version), f"bids-{version}", build, tag=listing_id
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
     
@@ -277,8 +418,36 @@ def get_notifications(user_id):
         if user_id != request.user_id:
             return jsonify({"error": "Unauthorized access"}), 403
 
-        # Fetch all notifications for the user
-        notifications = Notification.query.filter_by(user_id=user_id).all()
+        limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+        unread_only = parse_bool(request.args['unread_only']) if request.args.get('unread_only') else False
+
+        # Unread first, newest first within each group; served from
+        # ix_notification_user_id_is_read_id. Ids grow with created_at, so the keyset is
+        # (is_read, id): created_at has one-second resolution (and on SQLite is stored in a
+        # different format than a bound datetime), so it cannot tell rows apart.
+        query = Notification.query.filter(Notification.user_id == user_id)
+        if unread_only:
+            query = query.filter(Notification.is_read == False)
+
+        # Resume after the last row of the previous page
+        if request.args.get('cursor'):
+            last_read, last_id = decode_cursor(request.args['cursor'])
+            older = Notification.id < last_id
+            if last_read:
+                query = query.filter(Notification.is_read == True, older)
+            else:
+                query = query.filter(or_(Notification.is_read == True, and_(Notification.is_read == False, older)))
+
+        query = query.order_by(Notification.is_read.asc(), Notification.id.desc())
+
+        # Fetch one extra row to know whether there is another page
+        notifications = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(notifications) > limit:
+            notifications = notifications[:limit]
+            last = notifications[-1]
+            next_cursor = encode_cursor(last.is_read, last.id)
+
         return jsonify({
             "user_id": user_id,
             "notifications": [
@@ -289,10 +458,60 @@ def get_notifications(user_id):
                     "created_at": notification.created_at
                 }
                 for notification in notifications
-            ]
+            ],
+            "next_cursor": next_cursor
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 400
+
+
+# Number of unread notifications (an index-only count)
+@main.route('/notifications/<int:user_id>/unread-count', methods=['GET'])
+@require_auth
+def get_unread_notification_count(user_id):
+    try:
+        if user_id != request.user_id:
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        unread_count = db.session.execute(
+            select(func.count())
+            .select_from(Notification)
+            .where(Notification.user_id == user_id, Notification.is_read == False)
+        ).scalar()
+        return jsonify({"user_id": user_id, "unread_count": unread_count})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+# Most notifications a single bulk mark-read may name
+MAX_MARK_READ_IDS = 1000
+
+
+# Mark many notifications read in one UPDATE: {"ids": [1, 2, 3]} or {"all": true}
+@main.route('/notifications/read', methods=['PATCH'])
+@require_auth
+def mark_notifications_read():
+    try:
+        data = request.get_json(silent=True) or {}
+        query = update(Notification).where(Notification.user_id == request.user_id, Notification.is_read == False)
+
+        if data.get('all') is not True:
+            ids = data.get('ids')
+            if not isinstance(ids, list) or not ids:
+                return jsonify({"error": "Provide a non-empty ids list or \"all\": true"}), 400
+            if len(ids) > MAX_MARK_READ_IDS:
+                return jsonify({"error": f"At most {MAX_MARK_READ_IDS} ids per request"}), 400
+            if not all(isinstance(notification_id, int) and not isinstance(notification_id, bool) for notification_id in ids):
+                return jsonify({"error": "ids must be integers"}), 400
+            query = query.where(Notification.id.in_(ids))
+
+        # Other users' ids simply match nothing
+        result = db.session.execute(query.values(is_read=True).execution_options(synchronize_session=False))
+        db.session.commit()
+        return jsonify({"message": "Marked read", "updated": result.rowcount}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
     
     
     
@@ -343,16 +562,94 @@ def check_expired():
 @main.route('/listings/<int:id>/bids', methods=['GET'])
 def listing_bid_history(id):
     try:
-        bids = Bid.query.filter_by(listing_id=id).order_by(Bid.timestamp).all()
-        return jsonify([
-            {
-                "id": bid.id,
-                "amount": bid.amount,
-                "user_id": bid.user_id,
-                "timestamp": bid.timestamp
-            }
-            for bid in bids
-        ])
+        version = get_listing_version(id)
+        if version is None:
+            return jsonify([])
+
+        def build():
+            # Amount order is chronological order (bids strictly increase) and uses the (listing_id, amount) index
+            bids = Bid.query.filter_by(listing_id=id).order_by(Bid.amount).all()
+            return [
+                {
+                    "id": bid.id,
+                    "amount": bid.amount,
+                    "user_id": bid.user_id,
+                    "timestamp": bid.timestamp
+                }
+                for bid in bids
+            ]
+
+        return conditional_json_response(
+            bid_history_cache, ('history', id, version), f"history-{version}", build, tag=id
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+# Live bid updates: Server-Sent Events, or a JSON long-poll (?since=<bid_id>) for other clients
+@main.route('/listings/<int:id>/stream', methods=['GET'])
+def listing_stream(id):
+    try:
+        if get_listing_version(id) is None:
+            return jsonify({"error": "Listing not found"}), 404
+
+        # Resume point: ?since=, then the SSE Last-Event-ID header, then "only new bids"
+        since = request.args.get('since', type=int)
+        if since is None and request.headers.get('Last-Event-ID', '').isdigit():
+            since = int(request.headers['Last-Event-ID'])
+        if since is None:
+            since = db.session.execute(
+                select(Listing.highest_bid_id).where(Listing.id == id)
+            ).scalar() or 0
+
+        # Start this worker's poller before catching up so nothing falls in between
+        bid_events.start(current_app._get_current_object())
+        missed = [
+            bid_event(row, row.end_time)
+            for row in db.session.execute(
+                select(Bid.id, Bid.listing_id, Bid.amount, Bid.user_id, Bid.timestamp, Listing.end_time)
+                .join(Listing, Listing.id == Bid.listing_id)
+                .where(Bid.listing_id == id, Bid.id > since)
+                .order_by(Bid.id)
+                .limit(100)
+            )
+        ]
+        # Don't hold a pooled connection while the client waits
+        db.session.close()
+
+        heartbeat = current_app.config['STREAM_HEARTBEAT']
+        max_duration = current_app.config['STREAM_MAX_DURATION']
+        long_poll_timeout = current_app.config['LONG_POLL_TIMEOUT']
+
+        if request.accept_mimetypes.best_match(['application/json', 'text/event-stream']) != 'text/event-stream':
+            timeout = min(request.args.get('timeout', long_poll_timeout, type=float), long_poll_timeout)
+            events = missed or bid_events.wait(id, since, timeout)
+            return jsonify({
+                "listing_id": id,
+                "bids": events,
+                "last_bid_id": events[-1]["id"] if events else since
+            })
+
+        def generate(last_id):
+            yield "retry: 3000\n\n"
+            for event in missed:
+                last_id = event["id"]
+                yield f"id: {last_id}\nevent: bid\ndata: {json.dumps(event)}\n\n"
+            # Close long-lived streams periodically; EventSource reconnects with Last-Event-ID
+            deadline = time.monotonic() + max_duration
+            while time.monotonic() < deadline:
+                events = bid_events.wait(id, last_id, heartbeat)
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in events:
+                    last_id = event["id"]
+                    yield f"id: {last_id}\nevent: bid\ndata: {json.dumps(event)}\n\n"
+
+        return Response(
+            generate(since),
+            mimetype='text/event-stream',
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -365,9 +662,8 @@ def listing_highest_bid(id):
         if not listing:
             return jsonify({"error": "Listing not found"}), 404
 
-        
-        
-        bid = Bid.query.filter_by(listing_id=id).order_by(Bid.amount.desc()).first()
+        # Primary-key lookup through the denormalized pointer maintained by the bid engine
+        bid = db.session.get(Bid, listing.highest_bid_id) if listing.highest_bid_id else None
         if not bid:
             return jsonify({"id": None, "amount": listing.current_price, "user_id": None, "timestamp": None}), 200
         return jsonify({
@@ -380,6 +676,81 @@ def listing_highest_bid(id):
         return jsonify({"error": str(e)}), 400
 
 
+# Everything an auction page needs in one request: listing, seller, top bid, bid count and recent bids
+@main.route('/listings/<int:id>/summary', methods=['GET'])
+def listing_summary(id):
+    try:
+        limit = request.args.get('bids', current_app.config['LISTING_SUMMARY_BIDS'], type=int)
+        limit = max(1, min(limit, current_app.config['LISTING_SUMMARY_MAX_BIDS']))
+
+        key = (id, limit)
+        body = listing_summary_cache.get(key)
+        if body is None:
+            summary = build_listing_summary(id, limit)
+            if summary is None:
+                return jsonify({"error": "Listing not found"}), 404
+            body = current_app.json.dumps(summary)
+            listing_summary_cache.set(key, body, tag=id)
+
+        response = current_app.response_class(body, mimetype='application/json')
+        response.add_etag()
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def build_listing_summary(id, limit):
+    """
+    Load a listing summary with one query, or return None if the listing does not exist.
+    """
+    # Newest `limit` bids; accepted bids strictly increase, so this walks the (listing_id, amount) index backwards
+    recent = (
+        select(Bid.id, Bid.amount, Bid.user_id, Bid.timestamp)
+        .where(Bid.listing_id == id)
+        .order_by(Bid.amount.desc())
+        .limit(limit)
+        .subquery()
+    )
+    # One row per recent bid (or a single row with NULL bid columns), each carrying the listing and seller
+    rows = db.session.execute(
+        select(Listing, User.username, recent.c.id, recent.c.amount, recent.c.user_id, recent.c.timestamp)
+        .outerjoin(User, User.id == Listing.user_id)
+        .outerjoin(recent, true())
+        .where(Listing.id == id)
+        .order_by(recent.c.amount.desc())
+    ).all()
+    if not rows:
+        return None
+
+    listing, seller = rows[0][0], rows[0][1]
+    bids = [
+        {"id": bid_id, "amount": amount, "user_id": user_id, "timestamp": timestamp}
+        for _, _, bid_id, amount, user_id, timestamp in rows
+        if bid_id is not None
+    ]
+    # The highest bid is the newest one, so it heads the recent bids whenever there is one
+    top_bid = bids[0] if bids else {"id": None, "amount": listing.current_price, "user_id": None, "timestamp": None}
+    return {
+        "listing": {
+            "id": listing.id,
+            "title": listing.title,
+            "description": listing.description,
+            "starting_price": listing.starting_price,
+            "current_price": listing.current_price,
+            "end_time": listing.end_time,
+            "is_active": listing.is_active,
+            "user_id": listing.user_id,
+            "image_url": listing.image_url,
+            "thumb_url": listing.thumb_url,
+            "medium_url": listing.medium_url
+        },
+        "seller": {"id": listing.user_id, "username": seller},
+        "highest_bid": top_bid,
+        "bid_count": listing.bid_count,
+        "bids": bids
+    }
+
+
 @main.route('/notifications/<int:id>/read', methods=['PATCH'])
 @require_auth
 def mark_notification_read(id):
@@ -468,25 +839,17 @@ def login_user():
         # Find the user by username
         user = User.query.filter_by(username=data['username']).first()
         if not user:
-            print("User not found")  # Debugging log
+            logger.debug("Login failed: unknown username")
             return jsonify({"error": "Invalid username or password"}), 401
 
-        # Log the stored password hash and the provided password
-        print(f"Stored password hash: {user.password_hash}")  # Debugging log
-        print(f"Provided password: {data['password']}")  # Debugging log
-
         # Check the password
         if not check_password_hash(user.password_hash, data['password']):
-            print("Password check failed")  # Debugging log
+            logger.debug("Login failed: bad password for user %s", user.id)
             return jsonify({"error": "Invalid username or password"}), 401
 
-        # Log the user ID
-        print(f"User ID: {user.id}")  # Debugging log
-
         # Generate a JWT token using the SECRET_KEY
         exp_time = datetime.utcnow() + timedelta(hours=24)
         payload = {"user_id": user.id, "exp": exp_time.timestamp()}  # Convert exp to timestamp
-        print(f"JWT Payload: {payload}")  # Debugging log
 
         token = jwt.encode(
             payload,
@@ -496,7 +859,7 @@ def login_user():
 
         return jsonify({"message": "Login successful!", "token": token, "user_id": user.id}), 200
     except Exception as e:
-        print(f"Error in login_user: {str(e)}")  # Debugging log
+        logger.exception("Error in login_user")
         return jsonify({"error": str(e)}), 500
     
     
@@ -522,7 +885,7 @@ def upload_file():
         unique_file_name = f"{uuid4().hex}_{file_name}"
 
         # Upload the binary data to S3
-        s3 = boto3.client('s3')
+        s3 = get_s3_client()
         bucket = current_app.config['S3_BUCKET']
         region = current_app.config['S3_REGION']
 
@@ -536,12 +899,74 @@ def upload_file():
         # Generate the file path
         file_path = f"https://{bucket}.s3.{region}.amazonaws.com/{unique_file_name}"
 
+        # Queue thumbnail rendering now, so derivatives are usually ready before the listing is created
+        if file_type.startswith('image/'):
+            enqueue_image(file_path, unique_file_name)
+            db.session.commit()
+
         return jsonify({"file_path": file_path}), 200
 
     except Exception as e:
         return jsonify({'error': f"Failed to upload file: {str(e)}"}), 500
     
     
+# Stream an upload straight into S3 without buffering the whole file.
+# Send either a raw body (Content-Type: the file's type, ?file_name=photo.png) or
+# multipart/form-data with a "file" field. An optional X-Content-SHA256 header is
+# checked against the bytes received.
+@main.route('/upload-file/stream', methods=['POST'])
+@require_auth
+def upload_file_stream():
+    max_bytes = current_app.config['UPLOAD_MAX_BYTES']
+    if request.content_length and request.content_length > max_bytes:
+        return jsonify({'error': f"File exceeds the {max_bytes} byte limit"}), 413
+
+    try:
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if not upload or not upload.filename:
+                return jsonify({'error': 'Missing file'}), 400
+            file_name = upload.filename
+            file_type = upload.mimetype or 'application/octet-stream'
+            stream = upload.stream
+        else:
+            file_name = request.args.get('file_name')
+            file_type = request.mimetype
+            stream = request.stream
+            if not file_name or not file_type:
+                return jsonify({'error': 'Missing file_name or Content-Type'}), 400
+
+        # Generate a unique file name
+        unique_file_name = f"{uuid4().hex}_{file_name}"
+        bucket = current_app.config['S3_BUCKET']
+        region = current_app.config['S3_REGION']
+
+        size, sha256 = stream_to_s3(
+            stream,
+            bucket,
+            unique_file_name,
+            file_type,
+            part_size=current_app.config['UPLOAD_PART_SIZE'],
+            max_bytes=max_bytes,
+            expected_sha256=request.headers.get('X-Content-SHA256')
+        )
+
+        file_path = f"https://{bucket}.s3.{region}.amazonaws.com/{unique_file_name}"
+        if file_type.startswith('image/'):
+            enqueue_image(file_path, unique_file_name)
+            db.session.commit()
+
+        return jsonify({
+            "file_path": file_path,
+            "size": size,
+            "sha256": sha256
+        }), 200
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        return jsonify({'error': f"Failed to upload file: {str(e)}"}), 500
+
+
 @main.route('/generate-listing', methods=['POST'])
 @require_auth
 def generate_listing():
@@ -552,59 +977,74 @@ def generate_listing():
         return jsonify({"error": "Missing image_base64"}), 400
 
     try:
-        # Configure the Generative AI model
-        genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-        model = genai.GenerativeModel("gemini-1.5-flash")
-
         # Decode the Base64 image
         image_bytes = base64.b64decode(image_base64)
 
-        # Prompt for AI to generate title, description, and starting price
-        prompt = (
-            "Generate a title, description, and a suggested starting price in USD for an auction listing based on this image. "
-            "The response should include:\n"
-            "Title: [Your Title Here]\n"
-            "Description: [Your Description Here]\n"
-            "Starting Price: [Suggested Starting Price Here in USD]\n"
-        )
+        # Cached by image hash; identical concurrent requests share one model call
+        generator = get_listing_generator(current_app.config)
+        return jsonify(generator.generate(image_bytes)), 200
+
+    except GenerationError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Send the prompt and image to the AI model
-        response = model.generate_content([
-            prompt,
-            {
-                "mime_type": "image/png",  # or jpeg
-                "data": image_bytes
-            }
-        ])
-
-        # Extract the AI response
-        text = response.text.strip()
-
-        # Default values
-        title = "Generated Title"
-        description = text  # Default to the full response if parsing fails
-        starting_price = "10.00"  # Default starting price
-
-        # Parse the AI response for "Title:", "Description:", and "Starting Price:"
-        if "Title:" in text and "Description:" in text:
-            title = text.split("Title:")[1].split("Description:")[0].strip()
-            description = text.split("Description:")[1].split("Starting Price:")[0].strip()
-        if "Starting Price:" in text:
-            raw_price = text.split("Starting Price:")[1].strip().split("\n")[0]
-            # Clean up the starting price (remove symbols like "**" and "$")
-            starting_price = raw_price.replace("**", "").replace("$", "").strip()
-            # Ensure it's formatted as a valid currency
-            try:
-                starting_price = f"{float(starting_price):.2f}"  # Convert to float and format as 2 decimal places
-            except ValueError:
-                starting_price = "10.00"  # Fallback to default if parsing fails
-
-        # Return the generated data
-        return jsonify({
-            "title": title,
-            "description": description,
-            "starting_price": starting_price
-        }), 200
 
+# Submit a photo for AI listing generation without waiting for the model.
+# Send image_base64, or image_url of a photo already uploaded to our bucket.
+# Poll GET /generate-listing/jobs/<job_id> for the result.
+@main.route('/generate-listing/jobs', methods=['POST'])
+@require_auth
+def create_generation_job():
+    data = request.get_json() or {}
+    image_base64 = data.get("image_base64")
+    image_url = data.get("image_url")
+
+    if not image_base64 and not image_url:
+        return jsonify({"error": "Missing image_base64 or image_url"}), 400
+
+    try:
+        bucket = current_app.config['S3_BUCKET']
+        if image_base64:
+            job = enqueue_generation_job(request.user_id, bucket, image_bytes=base64.b64decode(image_base64))
+        else:
+            image_key = s3_key_for_url(image_url, bucket, current_app.config['S3_REGION'])
+            if not image_key:
+                return jsonify({"error": "image_url must point at an uploaded file"}), 400
+            job = enqueue_generation_job(request.user_id, bucket, image_key=image_key)
+
+        return jsonify(job_payload(job)), 202
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        db.session.rollback()
+        logger.exception("Error in create_generation_job")
+        return jsonify({"error": str(e)}), 500
+
+
+# Queue depth of the generation job worker
+@main.route('/generate-listing/jobs/stats', methods=['GET'])
+@require_auth
+def generation_job_stats():
+    try:
+        return jsonify(queue_stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Status (and, once finished, the generated title, description and starting price) of a job
+@main.route('/generate-listing/jobs/<job_id>', methods=['GET'])
+@require_auth
+def get_generation_job(job_id):
+    try:
+        job = db.session.get(GenerationJob, job_id)
+        # Other users' jobs are reported as missing
+        if not job or job.user_id != request.user_id:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job_payload(job)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Prometheus scrape endpoint (this worker's request, SQL and external-call metrics)
+@main.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -1,85 +1,188 @@
-
 """
+Expiry scheduler process.
+
+    python app/scheduler_worker.py
+
+Keeps an in-memory min-heap of (end_time, listing_id) for active listings and sleeps
+until the earliest deadline, so auctions close within about a second of end_time
+instead of on a fixed polling tick. New listings are picked up incrementally by
+polling for ids above the highest one seen so far (a primary-key range scan), and
+the heap is rebuilt from scratch every SCHEDULER_RESYNC_INTERVAL seconds to catch
+anything that slipped past (e.g. ids committed out of order).
+
+The closing itself is done by check_expired_listings, which closes every listing
+that is due. Soft close (SOFT_CLOSE_WINDOW) moves end_time later inside the bid
+transaction, so heap entries can be early but never late: a popped entry is checked
+against the listing's current end_time before anything is closed, and an extended
+listing is re-queued at its new deadline instead of triggering an empty sweep. The
+close itself only matches rows whose end_time has passed, under the row lock the
+bid path takes, so a listing extended between the check and the close stays open.
 
+Between deadlines the scheduler also runs notification retention (app/retention.py)
+every NOTIFICATION_RETENTION_INTERVAL seconds, one chunk per loop iteration.
+"""
 import sys
 import os
 
-
 # Add the project root directory to the Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
-
-from flask import Flask
-from app import db
-from app.models import Listing, User, Notification, Bid
-from apscheduler.schedulers.background import BackgroundScheduler
+from app import create_app, db
+from app.models import Listing
+from app.utils import check_expired_listings
+from app.retention import NotificationRetention
 from datetime import datetime
-from app.utils import send_sms
-from config import Config
+from sqlalchemy import select, func
+import heapq
 import logging
+import signal
+import threading
+import time
 
-# Function to check for expired listings
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Function to check for expired listings
-def check_expired_listings():
-    app = Flask(__name__)
-    app.config.from_object('config.Config')
-    db.init_app(app)
+# Wake slightly after a deadline so the listing is due when the sweep runs
+WAKE_SLACK = 0.05
 
-    with app.app_context():
+
+class ExpiryScheduler:
+    def __init__(self, refresh_interval=5.0, resync_interval=300.0, retention=None, retention_interval=3600.0):
+        self.refresh_interval = refresh_interval
+        self.resync_interval = resync_interval
+        self.retention = retention
+        self.retention_interval = retention_interval
+        self.heap = []
+        self.last_seen_id = 0
+        self.sweeps = 0  # Sweeps that ran check_expired_listings
+        self.requeued = 0  # Popped entries put back because their listing is still open
+        self.stop_event = threading.Event()
+
+    def resync(self):
+        """
+        Rebuild the heap from every active listing.
+        """
+        rows = db.session.execute(
+            select(Listing.end_time, Listing.id).where(Listing.is_active == True)
+        ).all()
+        self.heap = [(row.end_time, row.id) for row in rows]
+        heapq.heapify(self.heap)
+        self.last_seen_id = db.session.execute(select(func.max(Listing.id))).scalar() or 0
+        db.session.remove()
+        logger.info("Tracking %d active listings", len(self.heap))
+
+    def refresh(self):
+        """
+        Add listings created since the last refresh.
+        """
+        rows = db.session.execute(
+            select(Listing.id, Listing.end_time, Listing.is_active).where(Listing.id > self.last_seen_id)
+        ).all()
+        db.session.remove()
+        for row in rows:
+            self.last_seen_id = max(self.last_seen_id, row.id)
+            if row.is_active:
+                heapq.heappush(self.heap, (row.end_time, row.id))
+        if rows:
+            logger.info("Picked up %d new listings", len(rows))
+
+    def sweep(self):
+        """
+        Close everything that is due. Popped listings whose end_time moved later since
+        they were queued are re-queued at the new deadline.
+        """
         now = datetime.utcnow()
-        logger.info(f"Running check_expired_listings at {now}")
-        expired_listings = Listing.query.filter(Listing.end_time <= now, Listing.is_active == True).all()
-        logger.info(f"Found {len(expired_listings)} expired listings")
-        for listing in expired_listings:
-            logger.info(f"Marking listing {listing.id} as inactive")
-            listing.is_active = False
-            db.session.commit()
-
-            # Notify the seller
-            seller = User.query.get(listing.user_id)
-            if seller:
-                logger.info(f"Notifying seller {seller.id} about listing {listing.id}")
-                send_sms(seller.phone_number, f"Your listing '{listing.title}' has ended.")
-                seller_notification = Notification(
-                    user_id=listing.user_id,
-                    message=f"Your listing '{listing.title}' has ended.",
-                    is_read=False
-                )
-                db.session.add(seller_notification)
-
-            # Notify the highest bidder
-            highest_bid = Bid.query.filter_by(listing_id=listing.id).order_by(Bid.amount.desc()).first()
-            if highest_bid:
-                logger.info(f"Notifying winner {highest_bid.user_id} about listing {listing.id}")
-                winner = User.query.get(highest_bid.user_id)
-                if winner:
-                    send_sms(winner.phone_number, f"Congratulations! You won the listing '{listing.title}' with a bid of {highest_bid.amount}.")
-                    winner_notification = Notification(
-                        user_id=highest_bid.user_id,
-                        message=f"Congratulations! You won the listing '{listing.title}' with a bid of {highest_bid.amount}.",
-                        is_read=False
-                    )
-                    db.session.add(winner_notification)
-
-            db.session.commit()
-
-# Initialize the scheduler
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            due.append(heapq.heappop(self.heap)[1])
+        if not due:
+            return
+
+        rows = db.session.execute(
+            select(Listing.id, Listing.end_time)
+            .where(Listing.id.in_(due), Listing.is_active == True)
+        ).all()
+        if any(row.end_time <= now for row in rows):
+            check_expired_listings()  # Logs its own summary
+            self.sweeps += 1
+            # Re-read: a bid may have extended a listing after the first read
+            rows = db.session.execute(
+                select(Listing.id, Listing.end_time)
+                .where(Listing.id.in_(due), Listing.is_active == True)
+            ).all()
+        db.session.remove()
+        for row in rows:
+            heapq.heappush(self.heap, (row.end_time, row.id))
+        self.requeued += len(rows)
+
+    def run(self):
+        self.resync()
+        next_refresh = time.monotonic() + self.refresh_interval
+        next_resync = time.monotonic() + self.resync_interval
+        next_retention = time.monotonic() + self.retention_interval
+        logger.info("Scheduler started")
+
+        while not self.stop_event.is_set():
+            try:
+                self.sweep()
+                if time.monotonic() >= next_resync:
+                    self.resync()
+                    next_resync = time.monotonic() + self.resync_interval
+                    next_refresh = time.monotonic() + self.refresh_interval
+                elif time.monotonic() >= next_refresh:
+                    self.refresh()
+                    next_refresh = time.monotonic() + self.refresh_interval
+
+                if self.retention is not None and self.retention_interval > 0:
+                    if not self.retention.running and time.monotonic() >= next_retention:
+                        self.retention.start()
+                        next_retention = time.monotonic() + self.retention_interval
+                    if self.retention.running:
+                        self.retention.step()
+                        db.session.remove()
+            except Exception:
+                db.session.rollback()
+                db.session.remove()
+                logger.exception("Scheduler iteration failed")
+                # Don't spin on a failing retention chunk; the next interval starts afresh
+                if self.retention is not None and self.retention.running:
+                    self.retention.abort()
+
+            # Sleep until the next deadline or the next refresh, whichever comes first;
+            # don't sleep at all while a retention run has chunks left
+            timeout = next_refresh - time.monotonic()
+            if self.retention is not None and self.retention.running:
+                timeout = 0
+            if self.heap:
+                until_deadline = (self.heap[0][0] - datetime.utcnow()).total_seconds() + WAKE_SLACK
+                timeout = min(timeout, until_deadline)
+            self.stop_event.wait(max(timeout, 0))
+
+        logger.info("Scheduler stopped")
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+
+def main():
+    # One app, one engine and one app context for the life of the process
+    app = create_app()
+    scheduler = ExpiryScheduler(
+        refresh_interval=app.config['SCHEDULER_REFRESH_INTERVAL'],
+        resync_interval=app.config['SCHEDULER_RESYNC_INTERVAL'],
+        retention=NotificationRetention(
+            max_age_days=app.config['NOTIFICATION_RETENTION_DAYS'],
+            chunk_size=app.config['NOTIFICATION_RETENTION_CHUNK_SIZE'],
+            archive=app.config['NOTIFICATION_ARCHIVE']
+        ),
+        retention_interval=app.config['NOTIFICATION_RETENTION_INTERVAL']
+    )
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+
+    with app.app_context():
+        scheduler.run()
+
+
 if __name__ == "__main__":
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(func=check_expired_listings, trigger="interval", minutes=1)
-    logger.info("Scheduler started")
-    scheduler.start()
-
-    # Keep the script running
-    try:
-        while True:
-            pass
-    except (KeyboardInterrupt, SystemExit):
-        scheduler.shutdown()
-        
-        """
\ No newline at end of file
+    main()
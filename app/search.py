@@ -0,0 +1,142 @@
+"""
+Full-text search over listing titles and descriptions (GET /listings/search).
+
+The index lives in the database, so every gunicorn worker sees the same data and it
+stays current without any application code: rows written by create_listing, the bid
+engine or the expiry scheduler are indexed by the database as they commit.
+
+- MySQL: a FULLTEXT index on listing (title, description), queried with
+  MATCH ... AGAINST in boolean mode. InnoDB ranks matches by TF-IDF.
+- SQLite (local runs): an external-content FTS5 table, listing_fts, kept in sync by
+  triggers on listing and ranked with bm25().
+
+Every search word is required and matched as a prefix, so "vint cam" finds
+"Vintage camera". Results are ordered by relevance, best first, and paginated with
+a keyset cursor on (score, id). Scores depend on the whole index, so a page taken
+while listings are being added can repeat or skip a borderline result.
+"""
+from app import db
+from app.models import Listing
+from app.utils import encode_cursor, decode_cursor
+from sqlalchemy import DDL, event, and_, or_, select, func, column, table
+from sqlalchemy.dialects.mysql import match
+import re
+
+# Words searched for; longer queries are cut to the first MAX_SEARCH_TERMS words
+MAX_SEARCH_TERMS = 8
+_WORD = re.compile(r'\w+')
+
+# Title hits count for more than description hits (SQLite; MySQL weighs both columns alike)
+TITLE_WEIGHT = 5.0
+DESCRIPTION_WEIGHT = 1.0
+
+listing_fts = table('listing_fts', column('rowid'), column('listing_fts'))
+
+# SQLite index DDL: an external-content FTS5 table and the triggers that keep it in sync
+# with listing. Migrations carry their own frozen copy (dc725675713c), and a batch
+# migration that recreates listing drops the triggers and must create them again.
+SQLITE_FTS_TABLE = (
+    "CREATE VIRTUAL TABLE listing_fts USING fts5(title, description, content='listing', content_rowid='id')"
+)
+SQLITE_FTS_TRIGGERS = (
+    "CREATE TRIGGER listing_fts_insert AFTER INSERT ON listing BEGIN "
+    "INSERT INTO listing_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER listing_fts_delete AFTER DELETE ON listing BEGIN "
+    "INSERT INTO listing_fts (listing_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    # Only text edits touch the index; bids and expiry update other columns
+    "CREATE TRIGGER listing_fts_update AFTER UPDATE OF title, description ON listing BEGIN "
+    "INSERT INTO listing_fts (listing_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO listing_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+SQLITE_FTS_DROP = (
+    "DROP TRIGGER IF EXISTS listing_fts_update",
+    "DROP TRIGGER IF EXISTS listing_fts_delete",
+    "DROP TRIGGER IF EXISTS listing_fts_insert",
+    "DROP TABLE IF EXISTS listing_fts",
+)
+
+
+class SearchError(Exception):
+    """
+    Raised when a search cannot be run. Carries the HTTP status code the route should return.
+    """
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def search_terms(q):
+    """
+    The words of a query string, lowercased. Punctuation and search operators are dropped.
+    """
+    return _WORD.findall(q.lower())[:MAX_SEARCH_TERMS]
+
+
+def _match(terms, dialect):
+    """
+    (score, where clause, FTS table to join or None) for the given dialect. Higher scores
+    rank first.
+    """
+    if dialect == 'mysql':
+        score = match(Listing.title, Listing.description, against=' '.join(f'+{term}*' for term in terms))
+        score = score.in_boolean_mode()
+        return score, score, None
+    if dialect == 'sqlite':
+        # bm25() is better the more negative it is
+        score = -func.bm25(listing_fts.c.listing_fts, TITLE_WEIGHT, DESCRIPTION_WEIGHT)
+        where = listing_fts.c.listing_fts.match(' '.join(f'"{term}"*' for term in terms))
+        return score, where, listing_fts
+    raise SearchError(f"Search is not supported on {dialect}", 501)
+
+
+def search_listings(q, limit, fields, cursor=None, is_active=None):
+    """
+    One page of listings matching `q`, best first. Returns (rows, next_cursor), where each
+    row is a dict of `fields` plus "score".
+    """
+    terms = search_terms(q)
+    if not terms:
+        raise SearchError("Query must contain at least one word")
+
+    score, where, fts = _match(terms, db.session.get_bind().dialect.name)
+    score = score.label('score')
+    query = select(Listing.id, score, *[getattr(Listing, field) for field in fields if field != "id"])
+    if fts is not None:
+        query = query.join(fts, fts.c.rowid == Listing.id)
+    query = query.where(where)
+
+    if is_active is not None:
+        query = query.where(Listing.is_active == is_active)
+
+    # Resume after the last row of the previous page
+    if cursor:
+        last_score, last_id = decode_cursor(cursor)
+        query = query.where(or_(
+            score.element < last_score,
+            and_(score.element == last_score, Listing.id < last_id)
+        ))
+
+    # Fetch one extra row to know whether there is another page
+    rows = db.session.execute(query.order_by(score.desc(), Listing.id.desc()).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].score, rows[-1].id)
+
+    return [
+        dict({field: getattr(row, field) for field in fields}, score=row.score)
+        for row in rows
+    ], next_cursor
+
+
+# The MySQL FULLTEXT index is declared on Listing. On SQLite, create the FTS table and
+# its triggers alongside the listing table in db.create_all() (local and benchmark
+# databases); deployed databases get them from the Alembic migration.
+for statement in (SQLITE_FTS_TABLE,) + SQLITE_FTS_TRIGGERS:
+    event.listen(Listing.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(
+    Listing.__table__, 'before_drop',
+    DDL("DROP TABLE IF EXISTS listing_fts").execute_if(dialect='sqlite')
+)
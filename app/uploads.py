@@ -0,0 +1,86 @@
+"""
+Bounded-memory streaming uploads to S3.
+
+The request body is read in small chunks into a single reusable part buffer. Each
+full buffer is sent as one part of an S3 multipart upload, so a worker holds at
+most one part (UPLOAD_PART_SIZE) of any upload in memory, however large the file.
+Bodies that fit in one part skip the multipart round trips and go up with a single
+put_object. A SHA-256 of the bytes is computed as they stream past and can be
+checked against a digest the client sent.
+"""
+from app.clients import get_s3_client
+import hashlib
+
+# Bytes read from the request per iteration
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """
+    Raised when an upload is rejected. Carries the HTTP status code the route should return.
+    """
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def stream_to_s3(stream, bucket, key, content_type, part_size, max_bytes, expected_sha256=None):
+    """
+    Copy `stream` to s3://bucket/key. Returns (size, sha256 hex digest). On any failure
+    (too large, digest mismatch, S3 error) the partial upload is aborted.
+    """
+    s3 = get_s3_client()
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    parts = []
+    upload_id = None
+    size = 0
+
+    def flush_part():
+        nonlocal upload_id
+        if upload_id is None:
+            upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)['UploadId']
+        part_number = len(parts) + 1
+        response = s3.upload_part(
+            Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=buffer
+        )
+        parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        buffer.clear()
+
+    try:
+        while True:
+            chunk = stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadError(f"File exceeds the {max_bytes} byte limit", 413)
+            digest.update(chunk)
+            buffer += chunk
+            if len(buffer) >= part_size:
+                flush_part()
+
+        if size == 0:
+            raise UploadError("Empty upload")
+
+        sha256 = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            raise UploadError("Checksum mismatch: the upload was corrupted in transit")
+
+        if upload_id is None:
+            # Small file: one request, no multipart bookkeeping
+            s3.put_object(Bucket=bucket, Key=key, Body=buffer, ContentType=content_type)
+        else:
+            if buffer:
+                flush_part()
+            s3.complete_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts}
+            )
+        return size, sha256
+    except Exception:
+        if upload_id is not None:
+            try:
+                s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            except Exception:
+                pass
+        raise
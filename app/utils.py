@@ -1,82 +1,156 @@
-import boto3
 from flask import current_app, request, jsonify
 import os
-from twilio.rest import Client
-from app.models import Listing, User, Notification, Bid
+from app.clients import get_s3_client, get_twilio_client
+from app.models import Listing, User, Notification
 from app import db
+from app.outbox import enqueue_sms_many
+from app.cache import LRUCache
+from config import Config
 from datetime import datetime
+from sqlalchemy import select, update, insert
+from sqlalchemy.orm import aliased
 import logging
+import time
 from uuid import uuid4
 from functools import wraps
+import base64
+import hashlib
+import json
 import jwt
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_s3_client():
+logger = logging.getLogger(__name__)
+
+def encode_cursor(*values):
+    """
+    Encode a keyset position (the last row's sort key and id) as an opaque, URL-safe cursor.
+    """
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor. Raises ValueError if it has been tampered with.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+def parse_bool(value):
     """
-    Returns a boto3 S3 client. If running on AWS (Elastic Beanstalk), it will use the IAM Role.
+    Parse a boolean query string argument ("true"/"false", "1"/"0", "yes"/"no").
     """
-    return boto3.client(
-        's3',
-        aws_access_key_id=os.getenv('S3_ACCESS_KEY'),
-        aws_secret_access_key=os.getenv('S3_SECRET_KEY')
-    )
+    lowered = value.strip().lower()
+    if lowered in ('true', '1', 'yes'):
+        return True
+    if lowered in ('false', '0', 'no'):
+        return False
+    raise ValueError(f"Invalid boolean value: {value}")
 
 def send_sms(to, message):
-    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
     twilio_number = os.getenv("TWILIO_PHONE_NUMBER")
 
-    client = Client(account_sid, auth_token)
+    client = get_twilio_client()
     try:
         message = client.messages.create(
             body=message,
             from_=twilio_number,
             to=to
         )
-        print(f"SMS sent successfully: {message.sid}")
+        logger.debug("SMS sent successfully: %s", message.sid)
     except Exception as e:
-        print(f"Failed to send SMS to {to}: {str(e)}")
-        
-        
-logger = logging.getLogger(__name__)
+        logger.warning("Failed to send SMS: %s", e)
 
-def check_expired_listings():
-    now = datetime.utcnow()
-    logger.info(f"Running check_expired_listings at {now}")
-    expired_listings = Listing.query.filter(Listing.end_time <= now, Listing.is_active == True).all()
-    logger.info(f"Found {len(expired_listings)} expired listings")
 
-    for listing in expired_listings:
-        listing.is_active = False
-        db.session.commit()
+# Listings closed per UPDATE/commit in check_expired_listings
+EXPIRY_CHUNK_SIZE = 500
 
-        seller = User.query.get(listing.user_id)
-        if seller:
-            send_sms(seller.phone_number, f"Your listing '{listing.title}' has ended.")
-            seller_notification = Notification(
-                user_id=listing.user_id,
-                message=f"Your listing '{listing.title}' has ended.",
-                is_read=False
+def check_expired_listings(chunk_size=EXPIRY_CHUNK_SIZE):
+    """
+    Close every listing whose end_time has passed, in chunks. Each chunk is one locking
+    SELECT of ids, one UPDATE, one joined seller/winner query and bulk inserts of the
+    notifications and outbox SMS, committed together.
+    """
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    logger.info("Running check_expired_listings at %s", now)
+
+    total = 0
+    while True:
+        # Claim a chunk; SKIP LOCKED keeps concurrent sweeps from closing the same listings
+        ids = [
+            row.id for row in db.session.execute(
+                select(Listing.id)
+                .where(Listing.end_time <= now, Listing.is_active == True)
+                .order_by(Listing.end_time, Listing.id)
+                .limit(chunk_size)
+                .with_for_update(skip_locked=True)
             )
-            db.session.add(seller_notification)
-
-        highest_bid = Bid.query.filter_by(listing_id=listing.id).order_by(Bid.amount.desc()).first()
-        if highest_bid:
-            winner = User.query.get(highest_bid.user_id)
-            if winner:
-                send_sms(winner.phone_number, f"Congratulations! You won the listing '{listing.title}' with a bid of {highest_bid.amount}.")
-                winner_notification = Notification(
-                    user_id=highest_bid.user_id,
-                    message=f"Congratulations! You won the listing '{listing.title}' with a bid of {highest_bid.amount}.",
-                    is_read=False
-                )
-                db.session.add(winner_notification)
+        ]
+        if not ids:
+            db.session.rollback()
+            break
+
+        db.session.execute(
+            update(Listing)
+            .where(Listing.id.in_(ids), Listing.end_time <= now, Listing.is_active == True)
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
 
+        # Sellers and winners for the whole chunk in one query
+        seller = aliased(User)
+        winner = aliased(User)
+        rows = db.session.execute(
+            select(
+                Listing.id,
+                Listing.title,
+                Listing.user_id,
+                Listing.current_price,
+                Listing.highest_bidder_id,
+                seller.phone_number.label('seller_phone'),
+                winner.phone_number.label('winner_phone')
+            )
+            .join(seller, seller.id == Listing.user_id)
+            .outerjoin(winner, winner.id == Listing.highest_bidder_id)
+            .where(Listing.id.in_(ids))
+        ).all()
+
+        notifications = []
+        sms = []
+        for row in rows:
+            message = f"Your listing '{row.title}' has ended."
+            notifications.append({"user_id": row.user_id, "message": message, "is_read": False,
+                                  "listing_id": row.id, "kind": 'listing_ended'})
+            sms.append((row.seller_phone, message))
+            if row.highest_bidder_id:
+                # current_price is the winning bid amount
+                message = f"Congratulations! You won the listing '{row.title}' with a bid of {row.current_price}."
+                notifications.append({"user_id": row.highest_bidder_id, "message": message, "is_read": False,
+                                      "listing_id": row.id, "kind": 'listing_won'})
+                sms.append((row.winner_phone, message))
+
+        if notifications:
+            db.session.execute(insert(Notification), notifications)
+        enqueue_sms_many(sms)
         db.session.commit()
-    
-    return f"{len(expired_listings)} listings expired and notifications sent."
+
+        total += len(ids)
+        if len(ids) < chunk_size:
+            break
+
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else 0.0
+    logger.info("Expired %d listings in %.3fs (%.0f listings/s)", total, elapsed, rate,
+                extra={"expired": total, "elapsed": elapsed, "rate": rate})
+    return f"{total} listings expired and notifications sent ({rate:.0f} listings/s)."
 
 
 
@@ -85,12 +159,9 @@ def create_presigned_url(file_name, file_type):
     Generate a pre-signed URL for uploading a file to S3.
     """
     try:
-        
-        print(f"S3_BUCKET: {os.getenv('S3_BUCKET')}")  # Debug log
-        print(f"S3_REGION: {os.getenv('S3_REGION')}")  # Debug log
-        print(f"Incoming file_name: {file_name}, file_type: {file_type}")  # Debug log
+        logger.debug("Presigning upload file_name=%s file_type=%s", file_name, file_type)
 
-        s3 = boto3.client('s3')
+        s3 = get_s3_client()
         bucket = os.getenv('S3_BUCKET')
         region = os.getenv('S3_REGION')
 
@@ -114,35 +185,55 @@ def create_presigned_url(file_name, file_type):
             "file_path": f"https://{bucket}.s3.{region}.amazonaws.com/{unique_file_name}"
         }
     except Exception as e:
-        print(f"Error in create_presigned_url: {str(e)}")  # Debug log
+        logger.exception("Error in create_presigned_url")
         raise Exception(f"Failed to generate pre-signed URL: {str(e)}")
     
+# Verified tokens: sha256(token) -> user_id, each entry expiring at the token's exp
+token_cache = LRUCache(maxsize=Config.AUTH_TOKEN_CACHE_SIZE)
+# Cache lifetime for tokens issued without an exp claim
+TOKEN_CACHE_DEFAULT_TTL = 300
+
+
+def verify_token(token):
+    """
+    Return the user_id of a valid token. Retool resends the same token on every call,
+    so successful verifications are cached until the token expires; only the first
+    sight of a token pays for jwt.decode. Raises jwt.InvalidTokenError (including
+    ExpiredSignatureError) for bad tokens, which are never cached.
+    """
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    user_id = token_cache.get(key)
+    if user_id is not None:
+        return user_id
+
+    decoded = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+    user_id = decoded["user_id"]
+    ttl = decoded["exp"] - time.time() if "exp" in decoded else TOKEN_CACHE_DEFAULT_TTL
+    if ttl > 0:
+        token_cache.set(key, user_id, ttl=ttl)
+    return user_id
+
+
 def require_auth(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         token = request.headers.get("Authorization")
-        print(f"Authorization header: {token}")  # Debugging log
 
         if not token:
-            print("Missing token in request headers")  # Debugging log
+            logger.debug("Missing token in request headers")
             return jsonify({"error": "Missing token"}), 401
 
         try:
             # Remove "Bearer " prefix if present
             token = token.split(" ")[1] if " " in token else token
-            print(f"Token to decode: {token}")  # Debugging log
-
-            # Decode the JWT token using the SECRET_KEY from the app config
-            decoded = jwt.decode(token, os.getenv('SECRET_KEY'), algorithms=["HS256"])
-            print(f"Decoded token: {decoded}")  # Debugging log
 
             # Attach user_id to the request object for downstream use
-            request.user_id = decoded["user_id"]
+            request.user_id = verify_token(token)
         except jwt.ExpiredSignatureError:
-            print("Token has expired")  # Debugging log
+            logger.debug("Token has expired")
             return jsonify({"error": "Token expired"}), 401
         except jwt.InvalidTokenError as e:
-            print(f"Invalid token: {str(e)}")  # Debugging log
+            logger.debug("Invalid token: %s", e)
             return jsonify({"error": "Invalid token"}), 401
 
         return func(*args, **kwargs)
@@ -0,0 +1,169 @@
+"""
+Request payload validation for listings and bids.
+
+A Schema is compiled once, at import, into a tuple of per-field check functions.
+Validating a payload walks that tuple; nothing raises on the happy path, and bad
+input is rejected with every problem listed before any database access.
+
+Money is parsed to a Decimal with at most two decimal places, matching the
+NUMERIC(12, 2) money columns. JSON numbers are read through their shortest repr,
+so 10.1 becomes Decimal('10.10'), not the binary float's expansion.
+"""
+from collections import namedtuple
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+import math
+
+MONEY_QUANTUM = Decimal('0.01')
+MAX_MONEY = Decimal('9999999999.99')  # NUMERIC(12, 2)
+MAX_DESCRIPTION_LENGTH = 10000
+
+
+class ValidationError(Exception):
+    """
+    Raised when a payload fails its schema. Carries every error found and the HTTP status code.
+    """
+    def __init__(self, errors, status=400):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+        self.status = status
+
+
+Field = namedtuple('Field', ('check', 'required'))
+
+
+def parse_money(value, allow_zero=False):
+    """
+    (Decimal, None) for a positive amount with at most two decimal places, given as a
+    JSON number or a numeric string; otherwise (None, error message). allow_zero also
+    accepts 0, e.g. for a price filter bound.
+    """
+    if isinstance(value, bool):
+        return None, "must be a number"
+    if isinstance(value, int):
+        amount = Decimal(value)
+    elif isinstance(value, float):
+        if not math.isfinite(value):
+            return None, "must be a finite number"
+        amount = Decimal(repr(value))
+    elif isinstance(value, Decimal):
+        amount = value
+    elif isinstance(value, str):
+        try:
+            amount = Decimal(value.strip())
+        except InvalidOperation:
+            return None, "must be a number"
+        if not amount.is_finite():
+            return None, "must be a finite number"
+    else:
+        return None, "must be a number"
+
+    if allow_zero:
+        if amount < 0:
+            return None, "must be at least 0"
+    elif amount <= 0:
+        return None, "must be greater than 0"
+    if amount > MAX_MONEY:
+        return None, f"must be at most {MAX_MONEY}"
+    quantized = amount.quantize(MONEY_QUANTUM)
+    if quantized != amount:
+        return None, "must have at most two decimal places"
+    return quantized, None
+
+
+def money(required=True):
+    return Field(parse_money, required)
+
+
+def integer(minimum=1, required=True):
+    def check(value):
+        if isinstance(value, bool) or not isinstance(value, int):
+            return None, "must be an integer"
+        if value < minimum:
+            return None, f"must be at least {minimum}"
+        return value, None
+    return Field(check, required)
+
+
+def string(max_length, required=True):
+    def check(value):
+        if not isinstance(value, str):
+            return None, "must be a string"
+        value = value.strip()
+        if not value:
+            return None, "must not be blank"
+        if len(value) > max_length:
+            return None, f"must be at most {max_length} characters"
+        return value, None
+    return Field(check, required)
+
+
+def future_datetime(required=True):
+    # ISO 8601; aware times are converted to naive UTC, which is what the DateTime columns hold
+    def check(value):
+        if not isinstance(value, str):
+            return None, "must be an ISO 8601 date-time string"
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None, "must be an ISO 8601 date-time string"
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        if parsed <= datetime.utcnow():
+            return None, "must be in the future"
+        return parsed, None
+    return Field(check, required)
+
+
+class Schema:
+    """
+    A compiled set of fields. validate() returns the cleaned values or raises ValidationError.
+    Unknown keys are ignored.
+    """
+    def __init__(self, **fields):
+        self._fields = tuple(fields.items())
+
+    def validate(self, data):
+        if not isinstance(data, dict):
+            raise ValidationError(["Request body must be a JSON object"])
+
+        cleaned = {}
+        missing = []
+        errors = []
+        for name, field in self._fields:
+            value = data.get(name)
+            if value is None or value == '':
+                if field.required:
+                    missing.append(name)
+                continue
+            value, error = field.check(value)
+            if error is not None:
+                errors.append(f"{name} {error}")
+            else:
+                cleaned[name] = value
+
+        if missing:
+            errors.insert(0, f"Missing required fields: {', '.join(missing)}")
+        if errors:
+            raise ValidationError(errors)
+        return cleaned
+
+
+LISTING_SCHEMA = Schema(
+    title=string(200),
+    description=string(MAX_DESCRIPTION_LENGTH),
+    starting_price=money(),
+    end_time=future_datetime(),
+    user_id=integer(),
+    image_url=string(255, required=False),
+)
+
+BID_SCHEMA = Schema(
+    listing_id=integer(),
+    amount=money(),
+)
+
+MAX_BID_SCHEMA = Schema(
+    listing_id=integer(),
+    max_amount=money(),
+)
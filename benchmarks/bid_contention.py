@@ -0,0 +1,160 @@
+"""
+Bid contention benchmark.
+
+Fires N parallel bids at each of M listings through POST /bids and reports accepted
+bids per second and latency percentiles. Afterwards it checks the invariant the bid
+engine guarantees: every listing's current_price, highest_bid_id and bid_count agree
+with the accepted bids.
+
+    python benchmarks/bid_contention.py --listings 5 --bids-per-listing 200 --threads 32
+
+Runs against a throwaway SQLite file by default; pass --database-url to point it at
+a MySQL instance instead (it creates and drops its own tables, so never use prod).
+"""
+import sys
+import os
+
+# Add the project root directory to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+import argparse
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import jwt
+
+SECRET_KEY = "benchmark-secret"
+os.environ["SECRET_KEY"] = SECRET_KEY
+
+from app import create_app, db
+from app.bidding import minimum_bid
+from app.models import User, Listing, Bid
+from decimal import Decimal
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed(app, listings, bidders):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seller = User(username="seller", email="seller@example.com", password_hash="x", phone_number="")
+        db.session.add(seller)
+        users = [
+            User(username=f"bidder{i}", email=f"bidder{i}@example.com", password_hash="x", phone_number="")
+            for i in range(bidders)
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+        end_time = datetime.utcnow() + timedelta(hours=1)
+        rows = [
+            Listing(title=f"Listing {i}", description="benchmark", starting_price=1, current_price=1,
+                    end_time=end_time, user_id=seller.id, is_active=True)
+            for i in range(listings)
+        ]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [listing.id for listing in rows], [user.id for user in users]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temporary SQLite file)")
+    parser.add_argument("--listings", type=int, default=5)
+    parser.add_argument("--bidders", type=int, default=50)
+    parser.add_argument("--bids-per-listing", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bid_contention.db")
+
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "SECRET_KEY": SECRET_KEY,
+        "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": args.threads, "connect_args": {"timeout": 30}}
+        if database_url.startswith("sqlite") else {"pool_size": args.threads},
+    })
+    listing_ids, user_ids = seed(app, args.listings, args.bidders)
+    tokens = {
+        user_id: jwt.encode({"user_id": user_id, "exp": time.time() + 3600}, SECRET_KEY, algorithm="HS256")
+        for user_id in user_ids
+    }
+
+    # Every listing receives the same N-step ladder of amounts, each step the minimum
+    # raise over the one before (app/bidding.py:BID_INCREMENTS), in random order, all at once
+    ladder = [minimum_bid(Decimal('1.00'))]
+    while len(ladder) < args.bids_per_listing:
+        ladder.append(minimum_bid(ladder[-1]))
+    work = [
+        (listing_id, random.choice(user_ids), str(amount))
+        for listing_id in listing_ids
+        for amount in ladder
+    ]
+    random.shuffle(work)
+
+    def fire(job):
+        listing_id, user_id, amount = job
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post(
+            "/bids",
+            json={"listing_id": listing_id, "amount": amount},
+            headers={"Authorization": f"Bearer {tokens[user_id]}"}
+        )
+        return listing_id, Decimal(amount), response.status_code, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(fire, work))
+    elapsed = time.perf_counter() - started
+
+    accepted = [latency for _, _, status, latency in results if status == 201]
+    rejected = [latency for _, _, status, latency in results if status == 400]
+    errors = len(results) - len(accepted) - len(rejected)
+    latencies = [latency for _, _, _, latency in results]
+
+    # What the engine accepted per listing: (number of bids, highest amount)
+    accepted_bids = {listing_id: (0, None) for listing_id in listing_ids}
+    for listing_id, amount, status, _ in results:
+        if status == 201:
+            count, highest = accepted_bids[listing_id]
+            accepted_bids[listing_id] = (count + 1, amount if highest is None else max(highest, amount))
+
+    with app.app_context():
+        violations = 0
+        for listing_id in listing_ids:
+            listing = db.session.get(Listing, listing_id)
+            top = Bid.query.filter_by(listing_id=listing_id).order_by(Bid.amount.desc()).first()
+            count, highest = accepted_bids[listing_id]
+            # The top of the ladder beats every other step, so it is always accepted
+            if (not top or top.amount != highest or highest != ladder[-1]
+                    or listing.current_price != top.amount
+                    or listing.highest_bid_id != top.id
+                    or listing.bid_count != count
+                    or Bid.query.filter_by(listing_id=listing_id).count() != count):
+                violations += 1
+
+    print(f"bids fired:        {len(results)} ({args.listings} listings x {args.bids_per_listing}, {args.threads} threads)")
+    print(f"accepted:          {len(accepted)}  rejected: {len(rejected)}  errors: {errors}")
+    print(f"elapsed:           {elapsed:.2f}s")
+    print(f"accepted bids/s:   {len(accepted) / elapsed:.1f}")
+    print(f"requests/s:        {len(results) / elapsed:.1f}")
+    print(f"latency p50/p99:   {percentile(latencies, 50) * 1000:.1f}ms / {percentile(latencies, 99) * 1000:.1f}ms")
+    print(f"price violations:  {violations}")
+    return 1 if violations or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,472 @@
+"""
+Load test for the API's hot paths.
+
+Seeds N users, M listings and K bids (plus some notifications) with the models in
+app/models.py, then drives the app in-process from many threads with a weighted mix
+of requests for a fixed duration. Reports throughput and latency percentiles per
+endpoint and writes them to a JSON file so runs can be compared between commits.
+
+    python benchmarks/load_test.py --mix mixed --duration 30 --threads 32
+    python benchmarks/load_test.py --mix snipe --compare benchmarks/results/snipe-1a2b3c4.json
+    python benchmarks/load_test.py --mix softclose --soft-close-window 5 --soft-close-extension 5
+
+Mixes:
+    mixed   browsing, listing pages, bid history, notification polling and bidding
+    browse  read-only listing browsing
+    snipe   heavy bidding on a few hot listings close to their end_time
+    softclose
+            the snipe load with soft close on: hot listings are inside the closing
+            window from the first request, so bids keep extending them while the
+            expiry scheduler runs alongside. After the load the scheduler is left to
+            close them, then every hot listing is checked for bids at or after its
+            final end_time (a close that raced an extension). Any such bid, or a hot
+            listing still open, fails the run.
+
+Runs against a throwaway SQLite file by default; pass --database-url to point it at
+a MySQL instance instead (it creates and drops its own tables, so never use prod).
+"""
+import sys
+import os
+
+# Add the project root directory to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import jwt
+from sqlalchemy import insert
+
+SECRET_KEY = "benchmark-secret"
+os.environ["SECRET_KEY"] = SECRET_KEY
+
+from app import create_app, db
+from app.models import User, Listing, Bid, Notification
+from app.scheduler_worker import ExpiryScheduler
+
+RESULTS_DIR = os.path.join(project_root, "benchmarks", "results")
+
+# Mix name -> {operation: weight}
+MIXES = {
+    "mixed": {
+        "browse_listings": 35,
+        "get_listing": 15,
+        "bid_history": 15,
+        "poll_notifications": 10,
+        "place_bid_hot": 20,
+        "place_bid": 5,
+    },
+    "browse": {
+        "browse_listings": 60,
+        "get_listing": 25,
+        "bid_history": 15,
+    },
+    "snipe": {
+        "place_bid_hot": 70,
+        "bid_history_hot": 20,
+        "get_listing_hot": 10,
+    },
+    "softclose": {
+        "place_bid_hot": 70,
+        "bid_history_hot": 20,
+        "get_listing_hot": 10,
+    },
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def seed(app, args, rng):
+    """
+    Bulk-insert the dataset. Hot listings end shortly after the run does; the rest end
+    over the next week. Each listing's denormalized highest-bid columns are filled in
+    to match its seeded bids, as the bid engine would have left them.
+    """
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        now = datetime.utcnow()
+
+        db.session.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x", "phone_number": ""}
+            for i in range(args.users)
+        ])
+        user_ids = [row.id for row in db.session.execute(db.select(User.id)).all()]
+
+        hot_end = now + timedelta(seconds=args.duration + 30)
+        db.session.execute(insert(Listing), [
+            {
+                "title": f"Listing {i}",
+                "description": "Load test listing. " * 20,
+                "starting_price": 1.0,
+                "current_price": 1.0,
+                "end_time": hot_end if i < args.hot_listings else now + timedelta(seconds=rng.randint(600, 7 * 86400)),
+                "user_id": rng.choice(user_ids),
+                "image_url": None,
+                "is_active": True,
+                "bid_count": 0,
+            }
+            for i in range(args.listings)
+        ])
+        listing_rows = db.session.execute(db.select(Listing.id, Listing.user_id).order_by(Listing.id)).all()
+        listing_ids = [row.id for row in listing_rows]
+        sellers = {row.id: row.user_id for row in listing_rows}
+
+        # Bids climb by 1..5 per listing, from random bidders other than the seller
+        prices = {listing_id: 1.0 for listing_id in listing_ids}
+        bids = []
+        for _ in range(args.bids):
+            listing_id = rng.choice(listing_ids)
+            bidder = rng.choice(user_ids)
+            if bidder == sellers[listing_id]:
+                continue
+            prices[listing_id] += rng.randint(1, 5)
+            bids.append({"listing_id": listing_id, "user_id": bidder, "amount": prices[listing_id],
+                         "timestamp": now - timedelta(seconds=rng.randint(1, 86400))})
+        for start in range(0, len(bids), 5000):
+            db.session.execute(insert(Bid), bids[start:start + 5000])
+
+        db.session.execute(db.text(
+            "UPDATE listing SET bid_count = (SELECT COUNT(*) FROM bid WHERE bid.listing_id = listing.id)"
+        ))
+        db.session.execute(db.text(
+            "UPDATE listing SET highest_bid_id = (SELECT bid.id FROM bid WHERE bid.listing_id = listing.id "
+            "ORDER BY bid.amount DESC, bid.id ASC LIMIT 1)"
+        ))
+        db.session.execute(db.text(
+            "UPDATE listing SET highest_bidder_id = (SELECT bid.user_id FROM bid WHERE bid.id = listing.highest_bid_id), "
+            "current_price = COALESCE((SELECT bid.amount FROM bid WHERE bid.id = listing.highest_bid_id), current_price)"
+        ))
+
+        notifications = [
+            {"user_id": rng.choice(user_ids), "message": "You have been outbid.", "is_read": rng.random() < 0.7}
+            for _ in range(args.notifications)
+        ]
+        for start in range(0, len(notifications), 5000):
+            db.session.execute(insert(Notification), notifications[start:start + 5000])
+        db.session.commit()
+
+        return user_ids, listing_ids, sellers, prices
+
+
+class Workload:
+    """
+    The operations a mix is made of. Each takes (client, rng) and returns
+    (endpoint name, status code).
+    """
+    def __init__(self, user_ids, listing_ids, sellers, prices, hot_listings):
+        self.user_ids = user_ids
+        self.listing_ids = listing_ids
+        self.hot_ids = listing_ids[:hot_listings]
+        self.sellers = sellers
+        # Last price seen per listing; shared by all threads, so bids race realistically
+        self.prices = prices
+        self.tokens = {
+            user_id: jwt.encode({"user_id": user_id, "exp": time.time() + 86400}, SECRET_KEY, algorithm="HS256")
+            for user_id in user_ids
+        }
+
+    def _auth(self, user_id):
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    def _bid(self, client, rng, listing_id):
+        bidder = rng.choice(self.user_ids)
+        while bidder == self.sellers[listing_id]:
+            bidder = rng.choice(self.user_ids)
+        amount = self.prices[listing_id] + rng.randint(1, 5)
+        response = client.post("/bids", json={"listing_id": listing_id, "amount": amount}, headers=self._auth(bidder))
+        if response.status_code == 201:
+            self.prices[listing_id] = max(self.prices[listing_id], amount)
+        elif response.status_code == 400:
+            # Someone outbid us; catch up so the next bid has a chance
+            self.prices[listing_id] += 5
+        return "POST /bids", response.status_code
+
+    def place_bid(self, client, rng):
+        return self._bid(client, rng, rng.choice(self.listing_ids))
+
+    def place_bid_hot(self, client, rng):
+        return self._bid(client, rng, rng.choice(self.hot_ids))
+
+    def browse_listings(self, client, rng):
+        # A first page, sometimes followed by one or two more
+        sort = rng.choice(("end_time", "created_at"))
+        response = client.get(f"/listings?limit=50&is_active=true&sort={sort}")
+        pages = rng.choice((1, 1, 2, 3))
+        while pages > 1 and response.status_code == 200 and response.get_json().get("next_cursor"):
+            response = client.get(f"/listings?limit=50&is_active=true&sort={sort}&cursor={response.get_json()['next_cursor']}")
+            pages -= 1
+        return "GET /listings", response.status_code
+
+    def get_listing(self, client, rng):
+        return "GET /listings/<id>", client.get(f"/listings/{rng.choice(self.listing_ids)}").status_code
+
+    def get_listing_hot(self, client, rng):
+        return "GET /listings/<id>", client.get(f"/listings/{rng.choice(self.hot_ids)}").status_code
+
+    def bid_history(self, client, rng):
+        return "GET /bids/<id>", client.get(f"/bids/{rng.choice(self.listing_ids)}").status_code
+
+    def bid_history_hot(self, client, rng):
+        return "GET /bids/<id>", client.get(f"/bids/{rng.choice(self.hot_ids)}").status_code
+
+    def poll_notifications(self, client, rng):
+        user_id = rng.choice(self.user_ids)
+        response = client.get(f"/notifications/{user_id}", headers=self._auth(user_id))
+        return "GET /notifications/<user_id>", response.status_code
+
+
+def arm_soft_close(app, hot_ids, window):
+    """
+    Move the hot listings' end_time to just inside the closing window, so the first bids
+    on them already extend it. Returns their end times.
+    """
+    with app.app_context():
+        end_time = datetime.utcnow() + timedelta(seconds=window * 0.9)
+        db.session.execute(db.update(Listing).where(Listing.id.in_(hot_ids)).values(end_time=end_time))
+        db.session.commit()
+    return {listing_id: end_time for listing_id in hot_ids}
+
+
+def soft_close_report(app, hot_ids, armed, extension, scheduler):
+    """
+    Extensions per hot listing and any bid that landed at or after its listing's final
+    end_time. end_time only ever moves later and a bid needs end_time > now, so with a
+    correct soft close there are none.
+    """
+    with app.app_context():
+        listings = db.session.execute(
+            db.select(Listing.id, Listing.end_time, Listing.is_active).where(Listing.id.in_(hot_ids))
+        ).all()
+        late_bids = db.session.execute(
+            db.select(db.func.count())
+            .select_from(Bid)
+            .join(Listing, Listing.id == Bid.listing_id)
+            .where(Listing.id.in_(hot_ids), Bid.timestamp >= Listing.end_time)
+        ).scalar()
+        db.session.remove()
+
+    extended = {
+        row.id: round((row.end_time - armed[row.id]).total_seconds() / extension)
+        for row in listings
+    }
+    return {
+        "extensions": sum(extended.values()),
+        "max_extensions": max(extended.values(), default=0),
+        "closed": sum(1 for row in listings if not row.is_active),
+        "still_open": sum(1 for row in listings if row.is_active),
+        "late_bids": late_bids,
+        "scheduler_sweeps": scheduler.sweeps,
+        "scheduler_requeued": scheduler.requeued,
+    }
+
+
+def start_scheduler(app):
+    """
+    An expiry scheduler on a background thread, as the scheduler process would run it.
+    """
+    scheduler = ExpiryScheduler(refresh_interval=1.0, resync_interval=300.0)
+
+    def target():
+        with app.app_context():
+            scheduler.run()
+
+    thread = threading.Thread(target=target, name="scheduler", daemon=True)
+    thread.start()
+    return scheduler, thread
+
+
+def run(app, workload, mix, threads, duration, seed_value):
+    operations = [getattr(workload, name) for name in mix]
+    weights = list(mix.values())
+    samples = {}  # endpoint -> [(status, latency)]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed_value * 1000 + index)
+        client = app.test_client()
+        local = []
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            started = time.perf_counter()
+            endpoint, status = operation(client, rng)
+            local.append((endpoint, status, time.perf_counter() - started))
+        with lock:
+            for endpoint, status, latency in local:
+                samples.setdefault(endpoint, []).append((status, latency))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples, elapsed):
+    def stats(results):
+        latencies = [latency for _, latency in results]
+        return {
+            "requests": len(results),
+            "throughput": len(results) / elapsed,
+            "rejected": sum(1 for status, _ in results if 400 <= status < 500),
+            "errors": sum(1 for status, _ in results if status >= 500),
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p90_ms": percentile(latencies, 90) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "max_ms": max(latencies) * 1000 if latencies else 0.0,
+        }
+
+    endpoints = {endpoint: stats(results) for endpoint, results in sorted(samples.items())}
+    total = stats([sample for results in samples.values() for sample in results])
+    return endpoints, total
+
+
+def print_report(endpoints, total, baseline=None):
+    header = f"{'endpoint':<32}{'reqs':>8}{'req/s':>9}{'4xx':>7}{'5xx':>6}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(endpoints.items()) + [("TOTAL", total)]
+    for endpoint, row in rows:
+        print(f"{endpoint:<32}{row['requests']:>8}{row['throughput']:>9.1f}{row['rejected']:>7}{row['errors']:>6}"
+              f"{row['p50_ms']:>8.1f}ms{row['p90_ms']:>7.1f}ms{row['p99_ms']:>7.1f}ms{row['max_ms']:>7.1f}ms")
+
+    if baseline:
+        print()
+        print(f"vs {baseline['meta']['commit']} ({baseline['meta']['timestamp']}):")
+        before_rows = dict(baseline["endpoints"], TOTAL=baseline["total"])
+        for endpoint, row in rows:
+            before = before_rows.get(endpoint)
+            if not before:
+                continue
+            changes = []
+            for key, label in (("throughput", "req/s"), ("p50_ms", "p50"), ("p99_ms", "p99")):
+                if before[key]:
+                    changes.append(f"{label} {(row[key] - before[key]) / before[key] * 100:+.1f}%")
+            print(f"  {endpoint:<30}{'  '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temporary SQLite file)")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--listings", type=int, default=5000)
+    parser.add_argument("--hot-listings", type=int, default=5, help="Listings ending right after the run")
+    parser.add_argument("--bids", type=int, default=50000)
+    parser.add_argument("--notifications", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the data and the request sequence")
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/<mix>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier JSON results to diff against")
+    parser.add_argument("--soft-close-window", type=float, default=5.0,
+                        help="softclose mix: seconds before end_time in which a bid extends it")
+    parser.add_argument("--soft-close-extension", type=float, default=5.0,
+                        help="softclose mix: seconds each such bid adds")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "load_test.db")
+
+    soft_close = args.mix == "softclose"
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "SECRET_KEY": SECRET_KEY,
+        "LOG_LEVEL": "WARNING",
+        "SOFT_CLOSE_WINDOW": args.soft_close_window if soft_close else 0,
+        "SOFT_CLOSE_EXTENSION": args.soft_close_extension,
+        "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": args.threads, "connect_args": {"timeout": 30}}
+        if database_url.startswith("sqlite") else {"pool_size": args.threads},
+    })
+
+    rng = random.Random(args.seed)
+    seeding_started = time.perf_counter()
+    user_ids, listing_ids, sellers, prices = seed(app, args, rng)
+    print(f"seeded {len(user_ids)} users, {len(listing_ids)} listings, ~{args.bids} bids, "
+          f"{args.notifications} notifications in {time.perf_counter() - seeding_started:.1f}s")
+
+    workload = Workload(user_ids, listing_ids, sellers, prices, args.hot_listings)
+    if soft_close:
+        armed = arm_soft_close(app, workload.hot_ids, args.soft_close_window)
+        scheduler, scheduler_thread = start_scheduler(app)
+    samples, elapsed = run(app, workload, MIXES[args.mix], args.threads, args.duration, args.seed)
+    endpoints, total = summarize(samples, elapsed)
+
+    soft_close_stats = None
+    if soft_close:
+        # Bidding has stopped, so every hot listing ends within window + extension
+        drain_deadline = time.monotonic() + args.soft_close_window + args.soft_close_extension + 5
+        while time.monotonic() < drain_deadline:
+            with app.app_context():
+                open_count = db.session.execute(
+                    db.select(db.func.count()).where(Listing.id.in_(workload.hot_ids), Listing.is_active == True)
+                ).scalar()
+                db.session.remove()
+            if not open_count:
+                break
+            time.sleep(0.2)
+        scheduler.stop()
+        scheduler_thread.join()
+        soft_close_stats = soft_close_report(app, workload.hot_ids, armed, args.soft_close_extension, scheduler)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(endpoints, total, baseline)
+    if soft_close_stats:
+        print()
+        print("soft close: " + ", ".join(f"{key} {value}" for key, value in soft_close_stats.items()))
+
+    commit = git_commit()
+    results = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "mix": args.mix,
+            "database": database_url.split(":", 1)[0],
+            "python": platform.python_version(),
+            "elapsed": elapsed,
+            "args": {key: value for key, value in vars(args).items() if key not in ("database_url", "output", "compare")},
+        },
+        "endpoints": endpoints,
+        "total": total,
+    }
+    if soft_close_stats:
+        results["soft_close"] = soft_close_stats
+    output = args.output or os.path.join(RESULTS_DIR, f"{args.mix}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {output}")
+    failed = total["errors"] or (soft_close_stats and (soft_close_stats["late_bids"] or soft_close_stats["still_open"]))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Upload memory benchmark.
+
+Measures how much a worker's peak RSS grows while handling one upload, for the
+base64-in-JSON /upload-file endpoint and for the streaming /upload-file/stream
+endpoint. Each mode runs in a fresh subprocess so the peaks don't mask each other.
+S3 is replaced by a stand-in that discards the bytes, so only the app's own
+buffering is measured.
+
+    python benchmarks/upload_rss.py --size-mb 15
+"""
+import sys
+import os
+
+# Add the project root directory to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+import argparse
+import base64
+import io
+import resource
+import subprocess
+import time
+
+SECRET_KEY = "benchmark-secret"
+
+
+class DiscardingS3:
+    """
+    Accepts the S3 calls the upload endpoints make and throws the data away.
+    """
+    def put_object(self, **kwargs):
+        return {}
+
+    def create_multipart_upload(self, **kwargs):
+        return {'UploadId': 'benchmark'}
+
+    def upload_part(self, **kwargs):
+        return {'ETag': f'"{kwargs["PartNumber"]}"'}
+
+    def complete_multipart_upload(self, **kwargs):
+        return {}
+
+    def abort_multipart_upload(self, **kwargs):
+        return {}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_mode(mode, size_mb):
+    import jwt
+    from app import create_app
+    from app.clients import override_client
+
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": "sqlite://",
+        "SECRET_KEY": SECRET_KEY,
+        "S3_BUCKET": "benchmark",
+        "S3_REGION": "us-east-1",
+        "UPLOAD_MAX_BYTES": (size_mb + 1) * 1024 * 1024,
+    })
+    override_client('s3', DiscardingS3())
+    client = app.test_client()
+    token = jwt.encode({"user_id": 1, "exp": time.time() + 3600}, SECRET_KEY, algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+    payload = os.urandom(size_mb * 1024 * 1024)
+
+    if mode == 'json':
+        # The JSON body is what arrives on the wire; build it before taking the baseline
+        body = ('{"file_name": "bench.bin", "file_type": "application/octet-stream", "base64Data": "'
+                + base64.b64encode(payload).decode('ascii') + '"}').encode('ascii')
+        del payload
+        baseline = peak_rss_mb()
+        response = client.post("/upload-file", data=body, headers=headers, content_type="application/json")
+    else:
+        body = io.BytesIO(payload)
+        baseline = peak_rss_mb()
+        response = client.post(
+            "/upload-file/stream?file_name=bench.bin",
+            data=body,
+            headers={**headers, "Content-Type": "application/octet-stream"}
+        )
+
+    assert response.status_code == 200, response.get_json()
+    print(f"{peak_rss_mb() - baseline:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=15)
+    parser.add_argument("--mode", choices=["json", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.size_mb)
+        return
+
+    print(f"upload size: {args.size_mb} MiB")
+    for mode, label in (("json", "/upload-file (base64 JSON)"), ("stream", "/upload-file/stream")):
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--mode", mode, "--size-mb", str(args.size_mb)],
+            capture_output=True, text=True, check=True, env={**os.environ, "LOG_LEVEL": "WARNING"}
+        )
+        print(f"{label:30} peak RSS growth: {result.stdout.strip().splitlines()[-1]} MiB")
+
+
+if __name__ == "__main__":
+    main()
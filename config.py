@@ -8,5 +8,88 @@ class Config:
 
     S3_BUCKET = os.environ.get('S3_BUCKET')  # Use environment variable
     S3_REGION = os.environ.get('S3_REGION')  # Use environment variable
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') or None  # Local S3 stand-in (moto server, MinIO)
+
+    # Shared client tuning (app/clients.py)
+    AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', 25))  # Keep-alive connections per worker
+    AWS_MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', 3))  # Including the first try
+    AWS_CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', 5))
+    AWS_READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', 30))
+    TWILIO_TIMEOUT = float(os.environ.get('TWILIO_TIMEOUT', 10))
+    TWILIO_MAX_RETRIES = int(os.environ.get('TWILIO_MAX_RETRIES', 3))
+
+    # Streaming uploads (app/uploads.py)
+    UPLOAD_PART_SIZE = int(os.environ.get('UPLOAD_PART_SIZE', 8 * 1024 * 1024))  # S3 multipart part size (min 5 MiB)
+    UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 20 * 1024 * 1024))  # Matches nginx client_max_body_size
+
+    # Logging (app/log.py)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')  # DEBUG enables per-request debug logs
+    LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1.0))  # Fraction of DEBUG records kept
+
+    # SMS outbox dispatcher (python -m app.outbox)
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 100))  # Messages claimed per poll
+    OUTBOX_MAX_WORKERS = int(os.environ.get('OUTBOX_MAX_WORKERS', 8))  # Concurrent Twilio calls
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))  # Give up after this many failures
+    OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 1.0))  # Seconds to sleep when idle
+
+    # Verified JWT cache (app/utils.py)
+    AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))  # Tokens kept per worker
+
+    # Bid history caching (app/cache.py)
+    BID_HISTORY_CACHE_SIZE = int(os.environ.get('BID_HISTORY_CACHE_SIZE', 2048))  # Listings kept per worker
+    LISTING_VERSION_TTL = float(os.environ.get('LISTING_VERSION_TTL', 1.0))  # Seconds a worker trusts its cached bid version
+    LISTING_SUMMARY_TTL = float(os.environ.get('LISTING_SUMMARY_TTL', 5.0))  # Seconds a cached /listings/<id>/summary is served
+    LISTING_SUMMARY_BIDS = int(os.environ.get('LISTING_SUMMARY_BIDS', 10))  # Recent bids in a summary by default
+    LISTING_SUMMARY_MAX_BIDS = int(os.environ.get('LISTING_SUMMARY_MAX_BIDS', 50))  # Upper bound for ?bids=
+
+    # Soft close (app/bidding.py): a bid in the last SOFT_CLOSE_WINDOW seconds moves end_time
+    # back by SOFT_CLOSE_EXTENSION seconds. 0 disables it.
+    SOFT_CLOSE_WINDOW = float(os.environ.get('SOFT_CLOSE_WINDOW', 0))
+    SOFT_CLOSE_EXTENSION = float(os.environ.get('SOFT_CLOSE_EXTENSION', 120))
+
+    # Ending-soon and trending boards (app/leaderboards.py)
+    LEADERBOARD_TTL = float(os.environ.get('LEADERBOARD_TTL', 2.0))  # Seconds a worker serves a cached board
+
+    # Live bid streams (app/events.py)
+    STREAM_POLL_INTERVAL = float(os.environ.get('STREAM_POLL_INTERVAL', 0.5))  # Seconds between bid-table polls per worker
+    STREAM_HEARTBEAT = float(os.environ.get('STREAM_HEARTBEAT', 15.0))  # Seconds between SSE keep-alive comments
+    STREAM_MAX_DURATION = float(os.environ.get('STREAM_MAX_DURATION', 300.0))  # Seconds before an SSE client is asked to reconnect
+    LONG_POLL_TIMEOUT = float(os.environ.get('LONG_POLL_TIMEOUT', 25.0))  # Longest a long-poll request waits
+
+    # Expiry scheduler (python app/scheduler_worker.py)
+    SCHEDULER_REFRESH_INTERVAL = float(os.environ.get('SCHEDULER_REFRESH_INTERVAL', 5.0))  # Seconds between new-listing polls
+    SCHEDULER_RESYNC_INTERVAL = float(os.environ.get('SCHEDULER_RESYNC_INTERVAL', 300.0))  # Seconds between full heap rebuilds
 
     
+
+    # Image derivatives worker (python -m app.images)
+    IMAGE_FORMAT = os.environ.get('IMAGE_FORMAT', 'WEBP').upper()  # WEBP or JPEG
+    IMAGE_BATCH_SIZE = int(os.environ.get('IMAGE_BATCH_SIZE', 20))  # Images claimed per poll
+    IMAGE_MAX_WORKERS = int(os.environ.get('IMAGE_MAX_WORKERS', 0))  # Render processes; 0 means one per CPU
+    IMAGE_MAX_ATTEMPTS = int(os.environ.get('IMAGE_MAX_ATTEMPTS', 3))  # Give up after this many failures
+    IMAGE_POLL_INTERVAL = float(os.environ.get('IMAGE_POLL_INTERVAL', 2.0))  # Seconds to sleep when idle
+
+    # AI listing generation (app/ai.py)
+    AI_BACKEND = os.environ.get('AI_BACKEND', 'gemini')  # gemini, or fake for offline runs
+    GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash')
+    AI_TIMEOUT = float(os.environ.get('AI_TIMEOUT', 30.0))  # Seconds a request waits for the model
+    AI_MAX_WORKERS = int(os.environ.get('AI_MAX_WORKERS', 4))  # Concurrent model calls per worker
+    AI_MAX_PENDING = int(os.environ.get('AI_MAX_PENDING', 32))  # Distinct images in flight before answering 503
+    AI_CACHE_SIZE = int(os.environ.get('AI_CACHE_SIZE', 1024))  # Results kept per worker
+    AI_CACHE_TTL = float(os.environ.get('AI_CACHE_TTL', 86400.0))  # Seconds a result is reused
+    AI_FAKE_DELAY = float(os.environ.get('AI_FAKE_DELAY', 0.0))  # Simulated model latency for AI_BACKEND=fake
+
+    # AI generation jobs worker (python -m app.ai_jobs)
+    AI_JOB_CONCURRENCY = int(os.environ.get('AI_JOB_CONCURRENCY', 4))  # Jobs running at once per worker process
+    AI_JOB_MAX_ATTEMPTS = int(os.environ.get('AI_JOB_MAX_ATTEMPTS', 3))  # Give up after this many failures
+    AI_JOB_POLL_INTERVAL = float(os.environ.get('AI_JOB_POLL_INTERVAL', 1.0))  # Seconds to wait when idle
+
+    # Request and query instrumentation (app/metrics.py)
+    SLOW_QUERY_THRESHOLD = float(os.environ.get('SLOW_QUERY_THRESHOLD', 0.2))  # Seconds before a statement is logged as slow
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))  # Repeats of one statement per request before warning
+
+    # Notification retention (app/retention.py, run by the expiry scheduler)
+    NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 30))  # Read notifications older than this are removed
+    NOTIFICATION_RETENTION_CHUNK_SIZE = int(os.environ.get('NOTIFICATION_RETENTION_CHUNK_SIZE', 1000))  # Rows deleted per statement/commit
+    NOTIFICATION_RETENTION_INTERVAL = float(os.environ.get('NOTIFICATION_RETENTION_INTERVAL', 3600.0))  # Seconds between runs; 0 disables
+    NOTIFICATION_ARCHIVE = os.environ.get('NOTIFICATION_ARCHIVE', 'false').lower() in ('true', '1', 'yes')  # Copy to notification_archive before deleting
@@ -51,6 +51,18 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # SQLite's full-text search table and its shadow tables (app/search.py) are created
+    # by migration dc725675713c, not from the models
+    if type_ == 'table' and name.startswith('listing_fts'):
+        return False
+    # FULLTEXT indexes are only created on MySQL (Index.ddl_if), so don't compare them elsewhere
+    if (type_ == 'index' and not reflected and object.dialect_options['mysql']['prefix'] == 'FULLTEXT'
+            and context.get_context().dialect.name != 'mysql'):
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +77,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +106,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,35 @@
+"""proxy bids
+
+Revision ID: 05b266c9e20e
+Revises: 1a7cda0c3001
+Create Date: 2025-07-01 16:35:27.184409
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '05b266c9e20e'
+down_revision = '1a7cda0c3001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('proxy_bid',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('listing_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('max_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['listing_id'], ['listing.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('listing_id', 'user_id', name='uq_proxy_bid_listing_id_user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('proxy_bid')
@@ -0,0 +1,56 @@
+"""notification retention
+
+Revision ID: 0f23834b79b5
+Revises: 18df4c3565e5
+Create Date: 2025-06-06 15:31:44.702958
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0f23834b79b5'
+down_revision = '18df4c3565e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('listing_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('kind', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('repeat_count', sa.Integer(), server_default='1', nullable=False))
+        batch_op.create_index('ix_notification_is_read_created_at', ['is_read', 'created_at'], unique=False)
+        # Created before the foreign key so MySQL uses it instead of adding its own index
+        batch_op.create_index('ix_notification_listing_id_kind', ['listing_id', 'kind'], unique=False)
+        batch_op.create_foreign_key('fk_notification_listing_id_listing', 'listing', ['listing_id'], ['id'])
+
+    op.create_table('notification_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('listing_id', sa.Integer(), nullable=True),
+    sa.Column('kind', sa.String(length=20), nullable=True),
+    sa.Column('repeat_count', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notification_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_archive_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_archive_user_id_created_at')
+
+    op.drop_table('notification_archive')
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_notification_listing_id_listing', type_='foreignkey')
+        batch_op.drop_index('ix_notification_listing_id_kind')
+        batch_op.drop_index('ix_notification_is_read_created_at')
+        batch_op.drop_column('repeat_count')
+        batch_op.drop_column('kind')
+        batch_op.drop_column('listing_id')
@@ -0,0 +1,53 @@
+"""denormalized highest bid on listing
+
+Revision ID: 155a46b9ef7b
+Revises: 22706ad7c9f0
+Create Date: 2025-06-04 14:22:36.918204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '155a46b9ef7b'
+down_revision = '22706ad7c9f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('highest_bid_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('highest_bidder_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('bid_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_foreign_key('fk_listing_highest_bidder_id_user', 'user', ['highest_bidder_id'], ['id'])
+
+    with op.batch_alter_table('bid', schema=None) as batch_op:
+        batch_op.create_index('ix_bid_listing_id_amount', ['listing_id', 'amount'], unique=False)
+
+    # Backfill from the existing bids (earliest bid wins a tie, as it would have at the time)
+    op.execute(
+        "UPDATE listing SET bid_count = "
+        "(SELECT COUNT(*) FROM bid WHERE bid.listing_id = listing.id)"
+    )
+    op.execute(
+        "UPDATE listing SET highest_bid_id = "
+        "(SELECT bid.id FROM bid WHERE bid.listing_id = listing.id "
+        "ORDER BY bid.amount DESC, bid.id ASC LIMIT 1)"
+    )
+    op.execute(
+        "UPDATE listing SET highest_bidder_id = "
+        "(SELECT bid.user_id FROM bid WHERE bid.id = listing.highest_bid_id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('bid', schema=None) as batch_op:
+        batch_op.drop_index('ix_bid_listing_id_amount')
+
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_listing_highest_bidder_id_user', type_='foreignkey')
+        batch_op.drop_column('bid_count')
+        batch_op.drop_column('highest_bidder_id')
+        batch_op.drop_column('highest_bid_id')
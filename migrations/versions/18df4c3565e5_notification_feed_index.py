@@ -0,0 +1,37 @@
+"""notification feed index
+
+Revision ID: 18df4c3565e5
+Revises: 6e535195576c
+Create Date: 2025-06-06 11:05:29.441726
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '18df4c3565e5'
+down_revision = '6e535195576c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Unread-first ordering treats NULL as neither read nor unread; there should be none
+    op.execute("UPDATE notification SET is_read = false WHERE is_read IS NULL")
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.alter_column('is_read',
+               existing_type=sa.Boolean(),
+               nullable=False,
+               server_default=sa.false())
+        batch_op.create_index('ix_notification_user_id_is_read_created_at', ['user_id', 'is_read', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_user_id_is_read_created_at')
+        batch_op.alter_column('is_read',
+               existing_type=sa.Boolean(),
+               nullable=True,
+               server_default=None)
@@ -0,0 +1,64 @@
+"""fixed-point money columns
+
+Revision ID: 1a7cda0c3001
+Revises: 2eba461d9ac4
+Create Date: 2025-06-26 11:08:52.670413
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a7cda0c3001'
+down_revision = '2eba461d9ac4'
+branch_labels = None
+depends_on = None
+
+# Changing column types recreates listing on SQLite, which drops the full-text search
+# triggers from dc725675713c; put them back afterwards
+SQLITE_FTS_TRIGGERS = (
+    "CREATE TRIGGER listing_fts_insert AFTER INSERT ON listing BEGIN "
+    "INSERT INTO listing_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER listing_fts_delete AFTER DELETE ON listing BEGIN "
+    "INSERT INTO listing_fts (listing_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER listing_fts_update AFTER UPDATE OF title, description ON listing BEGIN "
+    "INSERT INTO listing_fts (listing_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO listing_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+# table -> [(column, nullable)]
+MONEY_COLUMNS = {
+    'listing': [('starting_price', False), ('current_price', False)],
+    'bid': [('amount', False)],
+    'generation_job': [('starting_price', True)],
+}
+
+
+def _convert(from_type, to_type):
+    dialect = op.get_bind().dialect.name
+    for table, columns in MONEY_COLUMNS.items():
+        if dialect == 'mysql':
+            # One ALTER per table, so listing is rebuilt once; existing values are rounded to the new scale
+            ddl = to_type.compile(dialect=op.get_bind().dialect)
+            op.execute(f"ALTER TABLE {table} " + ", ".join(
+                f"MODIFY {column} {ddl} {'NULL' if nullable else 'NOT NULL'}" for column, nullable in columns
+            ))
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column, nullable in columns:
+                batch_op.alter_column(column, existing_type=from_type, type_=to_type, existing_nullable=nullable)
+
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_TRIGGERS:
+            op.execute(statement)
+
+
+def upgrade():
+    _convert(sa.Float(), sa.Numeric(precision=12, scale=2))
+
+
+def downgrade():
+    _convert(sa.Numeric(precision=12, scale=2), sa.Float())
@@ -0,0 +1,78 @@
+"""listing trend score
+
+Revision ID: 2eba461d9ac4
+Revises: dc725675713c
+Create Date: 2025-06-23 09:41:15.902734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from collections import defaultdict
+from datetime import datetime, timedelta
+import math
+
+
+# revision identifiers, used by Alembic.
+revision = '2eba461d9ac4'
+down_revision = 'dc725675713c'
+branch_labels = None
+depends_on = None
+
+# Must match app/leaderboards.py
+TREND_EPOCH = datetime(2025, 1, 1)
+TREND_HALF_LIFE = 3600.0
+# Older bids have decayed to nothing; skip them
+BACKFILL_WINDOW = timedelta(days=2)
+
+# Dropping a column recreates listing on SQLite, which drops the full-text search
+# triggers from dc725675713c; the downgrade puts them back
+SQLITE_FTS_TRIGGERS = (
+    "CREATE TRIGGER listing_fts_insert AFTER INSERT ON listing BEGIN "
+    "INSERT INTO listing_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER listing_fts_delete AFTER DELETE ON listing BEGIN "
+    "INSERT INTO listing_fts (listing_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER listing_fts_update AFTER UPDATE OF title, description ON listing BEGIN "
+    "INSERT INTO listing_fts (listing_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO listing_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+
+def upgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('trend_score', sa.Double(), nullable=True))
+        batch_op.create_index('ix_listing_active_trend_score_id', ['is_active', 'trend_score', 'id'], unique=False)
+
+    # Score the active listings from their recent bids (needs a live connection; skipped with --sql)
+    if op.get_context().as_sql:
+        return
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text(
+            "SELECT bid.listing_id, bid.timestamp FROM bid JOIN listing ON listing.id = bid.listing_id "
+            "WHERE listing.is_active = :active AND bid.timestamp >= :since"
+        ),
+        {"active": True, "since": datetime.utcnow() - BACKFILL_WINDOW}
+    ).all()
+    positions = defaultdict(list)
+    for listing_id, timestamp in rows:
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        positions[listing_id].append((timestamp - TREND_EPOCH).total_seconds() / TREND_HALF_LIFE * math.log(2))
+
+    listing = sa.table('listing', sa.column('id', sa.Integer), sa.column('trend_score', sa.Double))
+    for listing_id, values in positions.items():
+        top = max(values)
+        score = top + math.log(sum(math.exp(value - top) for value in values))
+        bind.execute(listing.update().where(listing.c.id == listing_id).values(trend_score=score))
+
+
+def downgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.drop_index('ix_listing_active_trend_score_id')
+        batch_op.drop_column('trend_score')
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SQLITE_FTS_TRIGGERS:
+            op.execute(statement)
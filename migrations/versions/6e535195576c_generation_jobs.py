@@ -0,0 +1,48 @@
+"""generation jobs
+
+Revision ID: 6e535195576c
+Revises: f472535a5d1a
+Create Date: 2025-06-05 16:47:02.118390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e535195576c'
+down_revision = 'f472535a5d1a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('generation_job',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('image_key', sa.String(length=255), nullable=False),
+    sa.Column('image_sha256', sa.String(length=64), nullable=True),
+    sa.Column('title', sa.String(length=200), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('starting_price', sa.Float(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('generation_job', schema=None) as batch_op:
+        batch_op.create_index('ix_generation_job_status_next_attempt_at', ['status', 'next_attempt_at'], unique=False)
+        batch_op.create_index('ix_generation_job_image_sha256', ['image_sha256'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('generation_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_generation_job_image_sha256')
+        batch_op.drop_index('ix_generation_job_status_next_attempt_at')
+
+    op.drop_table('generation_job')
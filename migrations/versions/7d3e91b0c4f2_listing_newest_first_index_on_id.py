@@ -0,0 +1,31 @@
+"""listing newest-first index on id
+
+Revision ID: 7d3e91b0c4f2
+Revises: a608ccf85ba7
+Create Date: 2025-07-03 10:02:17.930416
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3e91b0c4f2'
+down_revision = 'a608ccf85ba7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /listings?sort=created_at now pages on id; the primary key serves the unfiltered order
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.create_index('ix_listing_active_id', ['is_active', 'id'], unique=False)
+        batch_op.drop_index('ix_listing_active_created_at_id')
+        batch_op.drop_index('ix_listing_created_at_id')
+
+
+def downgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.create_index('ix_listing_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_listing_active_created_at_id', ['is_active', 'created_at', 'id'], unique=False)
+        batch_op.drop_index('ix_listing_active_id')
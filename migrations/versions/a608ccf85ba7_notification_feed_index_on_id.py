@@ -0,0 +1,29 @@
+"""notification feed index on id
+
+Revision ID: a608ccf85ba7
+Revises: 05b266c9e20e
+Create Date: 2025-07-03 09:12:44.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a608ccf85ba7'
+down_revision = '05b266c9e20e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The feed now pages on (is_read, id) instead of (is_read, created_at, id)
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_user_id_is_read_id', ['user_id', 'is_read', 'id'], unique=False)
+        batch_op.drop_index('ix_notification_user_id_is_read_created_at')
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_user_id_is_read_created_at', ['user_id', 'is_read', 'created_at'], unique=False)
+        batch_op.drop_index('ix_notification_user_id_is_read_id')
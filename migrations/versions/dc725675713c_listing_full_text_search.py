@@ -0,0 +1,60 @@
+"""listing full-text search
+
+Revision ID: dc725675713c
+Revises: 0f23834b79b5
+Create Date: 2025-06-19 14:27:03.518240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dc725675713c'
+down_revision = '0f23834b79b5'
+branch_labels = None
+depends_on = None
+
+
+# SQLite has no FULLTEXT indexes; an external-content FTS5 table kept in sync by triggers
+# stands in for one (see app/search.py). Batch migrations that recreate listing drop
+# these triggers and must create them again.
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE listing_fts USING fts5(title, description, content='listing', content_rowid='id')",
+    "CREATE TRIGGER listing_fts_insert AFTER INSERT ON listing BEGIN "
+    "INSERT INTO listing_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER listing_fts_delete AFTER DELETE ON listing BEGIN "
+    "INSERT INTO listing_fts (listing_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER listing_fts_update AFTER UPDATE OF title, description ON listing BEGIN "
+    "INSERT INTO listing_fts (listing_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO listing_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    # Index the listings that already exist
+    "INSERT INTO listing_fts (listing_fts) VALUES ('rebuild')",
+)
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS listing_fts_update",
+    "DROP TRIGGER IF EXISTS listing_fts_delete",
+    "DROP TRIGGER IF EXISTS listing_fts_insert",
+    "DROP TABLE IF EXISTS listing_fts",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        # The first FULLTEXT index on an InnoDB table rebuilds it to add FTS_DOC_ID
+        op.execute("CREATE FULLTEXT INDEX ft_listing_title_description ON listing (title, description)")
+    elif dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.execute("DROP INDEX ft_listing_title_description ON listing")
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
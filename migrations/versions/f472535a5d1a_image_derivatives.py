@@ -0,0 +1,53 @@
+"""image derivatives
+
+Revision ID: f472535a5d1a
+Revises: 155a46b9ef7b
+Create Date: 2025-06-05 10:12:48.306117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f472535a5d1a'
+down_revision = '155a46b9ef7b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_asset',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('url', sa.String(length=255), nullable=False),
+    sa.Column('s3_key', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('thumb_url', sa.String(length=255), nullable=True),
+    sa.Column('medium_url', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('url')
+    )
+    with op.batch_alter_table('image_asset', schema=None) as batch_op:
+        batch_op.create_index('ix_image_asset_status_next_attempt_at', ['status', 'next_attempt_at'], unique=False)
+
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('thumb_url', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('medium_url', sa.String(length=255), nullable=True))
+        batch_op.create_index('ix_listing_image_url', ['image_url'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.drop_index('ix_listing_image_url')
+        batch_op.drop_column('medium_url')
+        batch_op.drop_column('thumb_url')
+
+    with op.batch_alter_table('image_asset', schema=None) as batch_op:
+        batch_op.drop_index('ix_image_asset_status_next_attempt_at')
+
+    op.drop_table('image_asset')
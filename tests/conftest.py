@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+import pytest
+
+SECRET_KEY = "test-secret"
+os.environ.setdefault("SECRET_KEY", SECRET_KEY)
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///" + str(tmp_path / "test.db"),
+        "SECRET_KEY": SECRET_KEY,
+        "LOG_LEVEL": "WARNING",
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def auth_headers(user_id):
+    token = jwt.encode({"user_id": user_id, "exp": time.time() + 3600}, SECRET_KEY, algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
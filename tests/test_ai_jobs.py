@@ -0,0 +1,43 @@
+"""
+Recording finished generation jobs (GenerationJobWorker._finish).
+"""
+from app import db
+from app.ai import ListingGenerator, FakeBackend
+from app.ai_jobs import GenerationJobWorker
+from app.models import User, GenerationJob
+from concurrent.futures import Future
+from decimal import Decimal
+import pytest
+
+
+def finish(price):
+    db.session.add(User(username="u", email="u@example.com", password_hash="x", phone_number=""))
+    db.session.add(GenerationJob(id="job1", user_id=1, image_key="uploads/photo.png", status="running"))
+    db.session.commit()
+
+    future = Future()
+    future.set_result(("0" * 64, {"title": "Lamp", "description": "A lamp", "starting_price": price}))
+    worker = GenerationJobWorker(ListingGenerator(FakeBackend()), "bucket", concurrency=1)
+    try:
+        finished = worker._finish(future, "job1", "uploads/photo.png", 0)
+        db.session.commit()
+    finally:
+        worker.executor.shutdown()
+    return finished, db.session.get(GenerationJob, "job1")
+
+
+def test_valid_price_is_stored(app):
+    finished, job = finish("12.50")
+    assert finished
+    assert job.status == "succeeded"
+    assert job.starting_price == Decimal("12.50")
+
+
+@pytest.mark.parametrize("price", ["inf", "nan", "1e15", "-3.00"])
+def test_invalid_price_fails_the_job(app, price):
+    finished, job = finish(price)
+    assert not finished
+    assert job.status == "failed"
+    assert job.starting_price is None
+    assert job.last_error.startswith("Generated starting_price must")
+    assert job.attempts == 1
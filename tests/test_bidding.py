@@ -0,0 +1,211 @@
+"""
+The bid engine (app/bidding.py): plain bids, proxy resolution, notifications and soft close.
+"""
+from app import db
+from app.bidding import submit_bid, submit_max_bid, BidError
+from app.models import User, Listing, Bid, ProxyBid, Notification, OutboxMessage
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+
+SELLER, ALICE, BOB, CAROL = 1, 2, 3, 4
+
+
+@pytest.fixture
+def listing(app):
+    """
+    A listing at 10.00 ending in a day. Carol has no phone number.
+    """
+    db.session.add_all([
+        User(username="seller", email="seller@example.com", password_hash="x", phone_number="+15550001"),
+        User(username="alice", email="alice@example.com", password_hash="x", phone_number="+15550002"),
+        User(username="bob", email="bob@example.com", password_hash="x", phone_number="+15550003"),
+        User(username="carol", email="carol@example.com", password_hash="x", phone_number=""),
+    ])
+    listing = Listing(title="Lamp", description="A lamp", starting_price=Decimal("10.00"),
+                      current_price=Decimal("10.00"), end_time=datetime.utcnow() + timedelta(days=1),
+                      user_id=SELLER, is_active=True)
+    db.session.add(listing)
+    db.session.commit()
+    return listing.id
+
+
+def state(listing_id):
+    listing = db.session.get(Listing, listing_id)
+    db.session.refresh(listing)
+    return listing
+
+
+def bids(listing_id):
+    return [(bid.user_id, bid.amount) for bid in Bid.query.filter_by(listing_id=listing_id).order_by(Bid.id)]
+
+
+def notifications(user_id):
+    return [notification.kind for notification in Notification.query.filter_by(user_id=user_id).order_by(Notification.id)]
+
+
+def sms_recipients():
+    return [message.recipient for message in OutboxMessage.query.order_by(OutboxMessage.id)]
+
+
+def test_bid_moves_the_listing(listing):
+    outcome = submit_bid(listing, ALICE, "10.50")
+
+    assert outcome.winning
+    assert outcome.current_price == Decimal("10.50")
+    row = state(listing)
+    assert row.current_price == Decimal("10.50")
+    assert row.highest_bid_id == outcome.bid.id
+    assert row.highest_bidder_id == ALICE
+    assert row.bid_count == 1
+    assert row.trend_score is not None
+
+
+@pytest.mark.parametrize("amount, message", [
+    ("10.25", "Bid must be at least 10.50"),  # One 0.50 increment above 10.00
+    ("-1", "Bid amount must be greater than 0"),
+    ("10.505", "Bid amount must have at most two decimal places"),
+])
+def test_bid_below_the_increment_is_rejected(listing, amount, message):
+    with pytest.raises(BidError, match=message):
+        submit_bid(listing, ALICE, amount)
+    assert bids(listing) == []
+
+
+def test_seller_cannot_bid(listing):
+    with pytest.raises(BidError, match="your own listing"):
+        submit_bid(listing, SELLER, "20.00")
+
+
+def test_ended_and_missing_listings(listing):
+    state(listing).end_time = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    with pytest.raises(BidError, match="has ended"):
+        submit_bid(listing, ALICE, "20.00")
+    with pytest.raises(BidError) as error:
+        submit_bid(listing + 1, ALICE, "20.00")
+    assert error.value.status == 404
+
+
+def test_outbid_bidder_and_seller_are_notified(listing):
+    submit_bid(listing, ALICE, "11.00")
+    submit_bid(listing, BOB, "12.00")
+
+    assert notifications(SELLER) == ["new_bid", "new_bid"]
+    assert notifications(ALICE) == ["outbid"]
+    assert notifications(BOB) == []
+    # Seller for each bid, then Alice when Bob outbid her
+    assert sms_recipients() == ["+15550001", "+15550001", "+15550002"]
+
+
+def test_first_maximum_bids_one_increment(listing):
+    outcome = submit_max_bid(listing, ALICE, "50.00")
+
+    assert outcome.winning
+    assert bids(listing) == [(ALICE, Decimal("10.50"))]
+    assert db.session.get(ProxyBid, 1).max_amount == Decimal("50.00")
+
+
+def test_plain_bid_below_a_maximum_is_answered_by_the_proxy(listing):
+    submit_max_bid(listing, ALICE, "50.00")
+    outcome = submit_bid(listing, BOB, "20.00")
+
+    assert not outcome.winning
+    assert outcome.current_price == Decimal("20.50")
+    assert bids(listing)[1:] == [(BOB, Decimal("20.00")), (ALICE, Decimal("20.50"))]
+    row = state(listing)
+    assert row.highest_bidder_id == ALICE
+    assert row.bid_count == 3
+    # Bob hears it from the response; his feed entry comes without an SMS
+    assert notifications(BOB) == ["outbid"]
+    assert notifications(ALICE) == []
+    assert "+15550003" not in sms_recipients()
+
+
+def test_higher_maximum_wins_one_increment_over_the_lower(listing):
+    submit_max_bid(listing, ALICE, "50.00")
+    outcome = submit_max_bid(listing, BOB, "80.00")
+
+    assert outcome.winning
+    assert outcome.current_price == Decimal("51.00")
+    assert bids(listing)[1:] == [(ALICE, Decimal("50.00")), (BOB, Decimal("51.00"))]
+    assert state(listing).highest_bidder_id == BOB
+    assert notifications(ALICE) == ["outbid"]
+    assert sms_recipients()[-1] == "+15550002"
+
+
+def test_lower_maximum_loses_to_the_leader(listing):
+    submit_max_bid(listing, ALICE, "50.00")
+    outcome = submit_max_bid(listing, BOB, "30.00")
+
+    # From 25.00 up the increment is 1.00
+    assert not outcome.winning
+    assert outcome.current_price == Decimal("31.00")
+    assert bids(listing)[1:] == [(BOB, Decimal("30.00")), (ALICE, Decimal("31.00"))]
+    assert state(listing).highest_bidder_id == ALICE
+
+
+def test_equal_maximum_goes_to_the_earlier_one(listing):
+    submit_max_bid(listing, ALICE, "50.00")
+    outcome = submit_max_bid(listing, BOB, "50.00")
+
+    assert not outcome.winning
+    assert outcome.current_price == Decimal("50.00")
+    assert bids(listing)[1:] == [(ALICE, Decimal("50.00"))]
+    assert state(listing).highest_bidder_id == ALICE
+
+
+def test_winning_maximum_is_capped_at_its_amount(listing):
+    submit_max_bid(listing, ALICE, "50.00")
+    outcome = submit_max_bid(listing, BOB, "50.50")
+
+    # One increment over 50.00 would be 51.00; Bob only authorised 50.50
+    assert outcome.winning
+    assert outcome.current_price == Decimal("50.50")
+
+
+def test_leader_raises_their_own_maximum(listing):
+    submit_max_bid(listing, ALICE, "50.00")
+    before = len(Notification.query.all())
+
+    outcome = submit_max_bid(listing, ALICE, "70.00")
+
+    assert outcome.winning
+    assert outcome.bid is None
+    assert outcome.current_price == Decimal("10.50")
+    assert bids(listing) == [(ALICE, Decimal("10.50"))]
+    assert ProxyBid.query.filter_by(listing_id=listing, user_id=ALICE).one().max_amount == Decimal("70.00")
+    assert len(Notification.query.all()) == before
+
+    with pytest.raises(BidError, match="more than 70.00"):
+        submit_max_bid(listing, ALICE, "60.00")
+
+
+def test_bidder_without_phone_gets_no_sms(listing):
+    submit_bid(listing, CAROL, "11.00")
+    submit_bid(listing, ALICE, "12.00")
+
+    assert notifications(CAROL) == ["outbid"]
+    assert sms_recipients() == ["+15550001", "+15550001"]
+
+
+def test_soft_close_extends_a_late_bid(app, listing):
+    app.config.update(SOFT_CLOSE_WINDOW=60, SOFT_CLOSE_EXTENSION=120)
+    end_time = datetime.utcnow() + timedelta(seconds=30)
+    state(listing).end_time = end_time
+    db.session.commit()
+
+    outcome = submit_bid(listing, ALICE, "11.00")
+
+    assert outcome.end_time == end_time + timedelta(seconds=120)
+    assert state(listing).end_time == outcome.end_time
+
+
+def test_soft_close_leaves_early_bids_alone(app, listing):
+    app.config.update(SOFT_CLOSE_WINDOW=60, SOFT_CLOSE_EXTENSION=120)
+    end_time = state(listing).end_time
+
+    outcome = submit_bid(listing, ALICE, "11.00")
+
+    assert outcome.end_time == end_time
+    assert state(listing).end_time == end_time
@@ -0,0 +1,18 @@
+"""
+Shared external-service clients (app/clients.py).
+"""
+from app import create_app
+from app.clients import get_s3_client, client_settings, S3_SETTINGS
+
+
+def test_s3_client_follows_app_config(app):
+    local = create_app(dict(app.config, S3_ENDPOINT_URL="http://127.0.0.1:5999", S3_REGION="us-east-1"))
+    with local.app_context():
+        client = get_s3_client()
+        assert client.meta.endpoint_url == "http://127.0.0.1:5999"
+        assert get_s3_client() is client
+        settings = client_settings(S3_SETTINGS)
+
+    # Another app gets its own client; captured settings rebuild the same one anywhere
+    assert get_s3_client() is not client
+    assert get_s3_client(settings) is client
@@ -0,0 +1,22 @@
+"""
+Queueing uploaded images for derivative rendering.
+"""
+from app import db
+from app.images import enqueue_image
+from app.models import ImageAsset
+
+
+def test_enqueue_image_skips_known_urls(app):
+    first = enqueue_image("https://bucket.s3/a.png", "a.png")
+    db.session.commit()
+    # A second request queuing the same URL, as two concurrent listings with one photo would
+    second = enqueue_image("https://bucket.s3/a.png", "a.png")
+    db.session.commit()
+
+    assert first.id == second.id
+    assert ImageAsset.query.count() == 1
+
+
+def test_enqueue_image_ignores_derivatives(app):
+    assert enqueue_image("https://bucket.s3/derivatives/a.png.thumb.webp", "derivatives/a.png.thumb.webp") is None
+    assert ImageAsset.query.count() == 0
@@ -0,0 +1,73 @@
+"""
+Keyset pagination: following next_cursor visits every row exactly once and ends.
+"""
+from app import db
+from app.models import User, Listing, Notification
+from datetime import datetime, timedelta
+from conftest import auth_headers
+
+
+def follow(client, url, key, headers=None):
+    """
+    The ids of every page reached by following next_cursor from `url`.
+    """
+    ids = []
+    cursor = None
+    for _ in range(100):
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        ids.extend(row["id"] for row in body[key])
+        cursor = body["next_cursor"]
+        if not cursor:
+            return ids
+    raise AssertionError(f"Pagination did not end: {ids[:20]}")
+
+
+def test_notifications_page_to_the_end(client):
+    db.session.add(User(username="u", email="u@example.com", password_hash="x", phone_number=""))
+    db.session.commit()
+    # Inserted within the same second, so created_at ties and comes from server_default
+    db.session.add_all([
+        Notification(user_id=1, message=f"n{i}", is_read=i % 3 == 0) for i in range(10)
+    ])
+    db.session.commit()
+
+    ids = follow(client, "/notifications/1?limit=2", "notifications", auth_headers(1))
+
+    unread = [n.id for n in Notification.query.filter_by(is_read=False).order_by(Notification.id.desc())]
+    read = [n.id for n in Notification.query.filter_by(is_read=True).order_by(Notification.id.desc())]
+    assert ids == unread + read
+    assert follow(client, "/notifications/1?limit=3&unread_only=true", "notifications", auth_headers(1)) == unread
+
+
+def test_listings_page_to_the_end_for_each_sort(client):
+    db.session.add(User(username="u", email="u@example.com", password_hash="x", phone_number=""))
+    db.session.commit()
+    soon = datetime.utcnow() + timedelta(days=1)
+    # Created within the same second; end_time ties in pairs
+    db.session.add_all([
+        Listing(title=f"l{i}", description="d", starting_price=1, current_price=1, user_id=1,
+                end_time=soon + timedelta(minutes=i // 2), is_active=True)
+        for i in range(9)
+    ])
+    db.session.commit()
+    listings = Listing.query.all()
+
+    by_end_time = [l.id for l in sorted(listings, key=lambda l: (l.end_time, l.id))]
+    assert follow(client, "/listings?limit=2&sort=end_time", "listings") == by_end_time
+
+    newest_first = sorted((l.id for l in listings), reverse=True)
+    assert follow(client, "/listings?limit=2&sort=created_at", "listings") == newest_first
+    assert follow(client, "/listings?limit=4&sort=created_at&is_active=true&fields=id,title", "listings") == newest_first
+
+
+def test_listings_price_bounds_accept_zero(client):
+    db.session.add(User(username="u", email="u@example.com", password_hash="x", phone_number=""))
+    db.session.add(Listing(title="l", description="d", starting_price=5, current_price=5, user_id=1,
+                           end_time=datetime.utcnow() + timedelta(days=1), is_active=True))
+    db.session.commit()
+
+    assert len(client.get("/listings?min_price=0").get_json()["listings"]) == 1
+    assert client.get("/listings?max_price=0").get_json()["listings"] == []
+    assert client.get("/listings?min_price=-1").status_code == 400